@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 from sys import argv
+from itertools import islice
 
 #################### Noel Arteche (noel.arteche@gmail.com) ####################
 ################################ August 2019 ##################################
@@ -444,6 +445,36 @@ class QBC:
             print("ERROR: Incorrect output selection.")
             return
         
+CHUNK_SIZE = 8192 # number of lines buffered before each write
+
+def write_QDIMACS(out, name, n, m, prefix, clauses, chunk_size=CHUNK_SIZE):
+    """
+    Writes a formula in the QDIMACS format directly onto a file object, in
+    chunks of at most chunk_size lines, so that the text of the whole formula
+    is never held in memory at once.
+    """
+    
+    out.write("c " + name + "\n") #identifier
+    out.write("c num. vars.: {}".format(n) + "\n")
+    out.write("c num. clauses.: {}".format(m) + "\n")
+    out.write("p cnf {} {}\n".format(n, m))
+
+    blocks = iter(prefix)
+    while True:
+        chunk = "".join([" ".join([B[0]] + [str(var) for var in B[1]] + ["0\n"])
+                         for B in islice(blocks, chunk_size)])
+        if not chunk:
+            break
+        out.write(chunk)
+
+    clauses = iter(clauses)
+    while True:
+        chunk = "".join([" ".join(map(str, C)) + " 0\n"
+                         for C in islice(clauses, chunk_size)])
+        if not chunk:
+            break
+        out.write(chunk)
+
 ###############################################################################
 #================================= QBF Class =================================#
 ###############################################################################
@@ -510,10 +541,15 @@ class QBF:
     
     convert()
         Converts the formula to a string in the QDIMACS format.
+    
+    write_QDIMACS(out, chunk_size=CHUNK_SIZE)
+        Writes the formula in QDIMACS directly onto the file object out,
+        without building the whole text in memory.
         
-    print_formula(mode='default', output='stdIO', filename=None)
+    print_formula(mode='default', output='stdIO', filename=None, stream=True)
         Prints the formula in the specified mode (normal for 'default' or QDIMACS
         or QCIR otherwise), either in the standard output or onto a text file.
+        QDIMACS files are streamed with write_QDIMACS unless stream is False.
         
     """
 
@@ -591,7 +627,16 @@ class QBF:
 
         return converted
 
-    def print_formula(self, mode='default', output='stdIO', filename=None):
+    def write_QDIMACS(self, out, chunk_size=CHUNK_SIZE):
+        """
+        Writes the formula in the QDIMACS format onto the file object out, in
+        buffered chunks instead of a single string.
+        """
+        
+        write_QDIMACS(out, self.get_name(), self.get_n_vars(), self.get_n_clauses(),
+                      self.get_prefix(), self.get_clauses(), chunk_size)
+
+    def print_formula(self, mode='default', output='stdIO', filename=None, stream=True):
         """
         Prints the formula in the desired format.
         
@@ -605,8 +650,19 @@ class QBF:
                         include the desired extension. If a name is not
                         specified, the name will be formed using the name of the
                         formula.
+            - stream: if True, QDIMACS files are written in chunks with
+                      write_QDIMACS instead of being converted to a single
+                      string first.
         """
         
+        if stream and mode == 'QDIMACS' and output == "file":
+            if filename == None: # default filename
+                filename = self.name + ".qdimacs"
+            file = open(filename, 'w')
+            self.write_QDIMACS(file)
+            file.close()
+            return
+        
         result = ""
         
         # Convert the formula to a string.
@@ -15,14 +15,13 @@
 
 import sys
 import os
+import gc
 import re
 import pdb
 import pprint
 import argparse
 from collections import OrderedDict
 
-sys.setrecursionlimit(1000000000) #added by noel
-
 stop = pdb.set_trace
 
 def die(text): 
@@ -47,7 +46,7 @@ def unique(coll):
         yield x
 
 def swap_keys_with_values(d):
-    return dict((v, k) for (k, v) in d.iteritems())
+    return dict((v, k) for (k, v) in d.items())
 
 
 ################################################################################
@@ -90,7 +89,7 @@ def read_qcir_file(filename):
             file_ptr = gzip.open(filename, 'r')
         else:
             file_ptr = open(filename, 'r')
-    except IOError, e:
+    except IOError as e:
         die(str(e))
     in_file = LineReader(file_ptr)
 
@@ -149,42 +148,10 @@ def read_qcir_file(filename):
         in_file.advance()
     
     quant_var_set = set(quant_vars)
+    qvar_to_num = number_quant_vars(quant_prefix, quant_vars, orig_names)
 
-    # Assign a positive integer to each quantified variable.
-    unassigned_nums = OrderedDict((x,x) for x in range(1, len(quant_vars) + 1))
-    qvar_to_num = {}
-    # If a variable name is already a number, keep it.
-    for qvar in quant_vars:
-        try:
-            n = int(qvar)
-        except:
-            continue
-        if n > len(quant_vars):
-            continue
-        qvar_to_num[qvar] = n
-        del unassigned_nums[n]
-    # Assign numbers to other variables.
-    for qvar in quant_vars:
-        if qvar in qvar_to_num:
-            continue
-        n = unassigned_nums.popitem(last=False)[0]
-        qvar_to_num[qvar] = n
-    # Create the reverse mapping
-    Glo.var_num_to_name = swap_keys_with_values(qvar_to_num)
-    for (var_num, var_name) in orig_names.items():
-        if str(var_num) not in quant_var_set:
-            continue
-        assert(Glo.var_num_to_name[var_num] == str(var_num))
-        Glo.var_num_to_name[var_num] = var_name
-
-    # Replace variable names with numbers in the prefix
-    for ii in range(0, len(quant_prefix)):
-        (qtype, qvars) = quant_prefix[ii]
-        qvars = [qvar_to_num[x] for x in qvars]
-        quant_prefix[ii] = (qtype, qvars)
-    
     gate_to_def = {}
-    Glo.gate_to_orig_names = {}
+    Glo.ctx.gate_to_orig_names = {}
 
     def lit_str_to_fmla(arg, die_fn=LineDie):
         # Given a string representing a literal, return the corresponding formula.
@@ -236,7 +203,7 @@ def read_qcir_file(filename):
                 LineDie("Gate '%s' was already defined.")
             gate_fmla = Fmla(op, *[lit_str_to_fmla(x) for x in args])
             gate_to_def[gate_var] = gate_fmla
-            Glo.gate_to_orig_names.setdefault(gate_fmla, []).append(gate_var)
+            Glo.ctx.gate_to_orig_names.setdefault(gate_fmla, []).append(gate_var)
         #except Exception, e:
         #    die("Error trying to parse line %i." % (in_file.line_num))
         in_file.advance()
@@ -246,21 +213,89 @@ def read_qcir_file(filename):
     return [quant_prefix, out_fmla]
 
 
-##############################################################################
+def number_quant_vars(quant_prefix, quant_vars, orig_names={}):
+    # Assigns a positive integer to each quantified variable (given by name in
+    # quant_vars, in order of appearance), replaces the names by the numbers
+    # in quant_prefix and sets the var_num_to_name table of the current
+    # context. Returns the dictionary from names to numbers.
+    quant_var_set = set(quant_vars)
+
+    # Assign a positive integer to each quantified variable.
+    unassigned_nums = OrderedDict((x,x) for x in range(1, len(quant_vars) + 1))
+    qvar_to_num = {}
+    # If a variable name is already a number, keep it.
+    for qvar in quant_vars:
+        try:
+            n = int(qvar)
+        except:
+            continue
+        if n > len(quant_vars):
+            continue
+        qvar_to_num[qvar] = n
+        del unassigned_nums[n]
+    # Assign numbers to other variables.
+    for qvar in quant_vars:
+        if qvar in qvar_to_num:
+            continue
+        n = unassigned_nums.popitem(last=False)[0]
+        qvar_to_num[qvar] = n
+    # Create the reverse mapping
+    var_num_to_name = Glo.ctx.var_num_to_name = swap_keys_with_values(qvar_to_num)
+    for (var_num, var_name) in orig_names.items():
+        if str(var_num) not in quant_var_set:
+            continue
+        assert(var_num_to_name[var_num] == str(var_num))
+        var_num_to_name[var_num] = var_name
+
+    # Replace variable names with numbers in the prefix
+    for ii in range(0, len(quant_prefix)):
+        (qtype, qvars) = quant_prefix[ii]
+        qvars = [qvar_to_num[x] for x in qvars]
+        quant_prefix[ii] = (qtype, qvars)
 
-class memoized(object):
-    def __init__(self, func):
-        self.func = func
-        self.cache = {}
-    def __call__(self, *args):
+    return qvar_to_num
+
+def read_int_circuit(prefix, gates, output_lit):
+    # Counterpart of read_qcir_file for a circuit given as integers instead
+    # of QCIR text: prefix is a list of blocks (quantifier, variables), gates
+    # an iterable of gates (gate, op, inputs), with op a QCIR gate type, every
+    # gate defined before it is used, and literals are signed integers.
+    # Variables and gates are numbered as read_qcir_file numbers the same
+    # circuit written in QCIR, so both give the same output. Being called by
+    # library code, it raises a ValueError on a bad circuit instead of exiting
+    # with die.
+    quant_prefix = [[qtype, [str(x) for x in qvars]] for (qtype, qvars) in prefix]
+    quant_vars = [x for (qtype, qvars) in quant_prefix for x in qvars]
+    qvar_to_num = number_quant_vars(quant_prefix, quant_vars)
+    # formula of every variable and gate defined so far
+    lit_to_def = dict((int(x), n) for (x, n) in qvar_to_num.items())
+    gate_to_orig_names = Glo.ctx.gate_to_orig_names = {}
+
+    def lit_to_fmla(lit):
+        fmla = lit_to_def[abs(lit)]
+        return fmla if lit > 0 else negate(fmla)
+
+    for (gate, op, args) in gates:
+        if op not in ("and", "or", "xor", "ite"):
+            raise ValueError("Unrecognized operator: '%s'" % op)
+        if (op == "xor" and len(args) != 2) or (op == "ite" and len(args) != 3):
+            raise ValueError("Gate %i has a wrong number of inputs for '%s'." % (gate, op))
+        if gate in lit_to_def:
+            raise ValueError("Gate %i was already defined or quantified." % (gate,))
         try:
-            return self.cache[args]
-        except KeyError:
-            value = self.func(*args)
-            self.cache[args] = value
-            return value
+            gate_fmla = Fmla(op, *[lit_to_fmla(x) for x in args])
+        except KeyError as e:
+            raise ValueError("Variable %i was not quantified and was not defined as a gate variable." % e.args)
+        lit_to_def[gate] = gate_fmla
+        gate_to_orig_names.setdefault(gate_fmla, []).append(str(gate))
+    try:
+        return [quant_prefix, lit_to_fmla(output_lit)]
+    except KeyError as e:
+        raise ValueError("Error looking up output literal %i." % (output_lit,))
 
 
+##############################################################################
+
 class Glo(object):  # for global variables
     pass
 
@@ -269,11 +304,8 @@ def is_lit(x):
     return type(x) == int
 
 class Fmla(tuple):
-    id_cache = {}
-    idx = {}
-    next_idx = 1
-    rev_hash = {}
-    hash = {}
+    # Formulas are hash-consed in the table of the current ConversionContext,
+    # so equal formulas are the same object and are compared by identity.
 
     def __eq__(self, other): return (self is other)
     def __ne__(self, other): return not(self is other)
@@ -281,17 +313,81 @@ class Fmla(tuple):
     __hash__ = object.__hash__
 
     def __new__(cls, *args):
-        ret = Fmla.id_cache.get(args, None)
+        ctx = Glo.ctx
+        ret = ctx.id_cache.get(args, None)
         if (ret is None):
+            if ctx.max_nodes is not None and len(ctx.id_cache) >= ctx.max_nodes:
+                raise MemoryError("more than %i formula nodes in the conversion" % (ctx.max_nodes,))
             ret = tuple.__new__(Fmla, args)
             if args[0] == 'xor': assert(len(args[1:]) == 2)
             if args[0] == 'ite': assert(len(args[1:]) == 3)
-            Fmla.id_cache[args] = ret
-            assert(ret not in Fmla.idx)
-            Fmla.idx[ret] = Fmla.next_idx
-            Fmla.next_idx += 1
+            ctx.id_cache[args] = ret
+            assert(ret not in ctx.idx)
+            ctx.idx[ret] = ctx.next_idx
+            ctx.next_idx += 1
         return ret
 
+class ConversionContext(object):
+    # Owns the tables of a conversion: the hash-consing table of Fmla
+    # (id_cache, with the index of every node in idx), the memo caches of
+    # simplify and to_andor and the original names of the variables and the
+    # gates. The current context is Glo.ctx; converting every circuit in its
+    # own context, as in
+    #     with ConversionContext():
+    #         [quant_prefix, fmla] = read_qcir_file(filename)
+    #         ...
+    # releases the tables once the block ends, so a process converting many
+    # circuits does not keep every formula node it has seen. The formulas of
+    # a context must not be used after it ends.
+    # If max_nodes is given, creating more than max_nodes formula nodes in the
+    # context raises a MemoryError (the memo caches have at most one entry per
+    # node or literal). The tables cannot be emptied during a conversion
+    # instead, since formulas are compared by identity.
+    # The garbage collector is disabled while a context is active: formulas
+    # have no cycles, and the collector would otherwise go through the
+    # growing tables again and again while they are built.
+    # Glo.ctx and the state of the collector are global to the process, so
+    # contexts may be nested but not used from several threads at once.
+    def __init__(self, max_nodes=None):
+        self.max_nodes = max_nodes
+        self.id_cache = {}
+        self.idx = {}
+        self.next_idx = 1
+        self.simplify_cache = {}
+        self.to_andor_cache = {}
+        self.gate_to_orig_names = {}
+        self.var_num_to_name = {}
+        self.outer = None
+        self.gc_enabled = None
+
+    def __enter__(self):
+        self.outer = Glo.ctx
+        Glo.ctx = self
+        self.gc_enabled = gc.isenabled()
+        gc.disable()
+        # the constants are shared by all the contexts
+        self.id_cache[(True,)] = Fmla_True
+        self.id_cache[(False,)] = Fmla_False
+        return self
+
+    def __exit__(self, *exc_info):
+        Glo.ctx = self.outer
+        self.outer = None
+        self.release()
+        if self.gc_enabled:
+            gc.enable()
+        return False
+
+    def release(self):
+        self.id_cache.clear()
+        self.idx.clear()
+        self.simplify_cache.clear()
+        self.to_andor_cache.clear()
+        self.gate_to_orig_names.clear()
+        self.var_num_to_name.clear()
+
+Glo.ctx = ConversionContext()  # the context of the conversions outside any other
+
 Fmla_True = Fmla(True)
 Fmla_False = Fmla(False)
 
@@ -306,10 +402,14 @@ def negate(fmla):
         
 ##############################################################################
 
-def write_qcir(self, prefix, outf):
+def write_qcir(self, prefix, outf, info=None, options=None):
+    # info is the DagInfo of self (computed if None), options the parsed
+    # command-line options (Glo.args if None).
+    if options is None:
+        options = Glo.args
     if type(outf) == str:
         with open(outf, 'wt') as f:
-            write_qcir(self, prefix, f)
+            write_qcir(self, prefix, f, info, options)
             return
     if (self in (Fmla_True, Fmla_False)):
         q = "exists" if self == Fmla_True else "forall"
@@ -320,15 +420,15 @@ def write_qcir(self, prefix, outf):
         outf.close()
         return
     
-    nesting_info = get_subformula_print_ordering(self)
+    nesting_info = get_subformula_print_ordering(self, info)
     subformulas = [fmla for (order, fmla) in sorted((order, fmla) for (fmla, order) in nesting_info.items())]
     fmla_num = calc_subfmla_nums(subformulas)
     subformulas = [x for x in subformulas if not is_lit(x)]
 
     outf.write("#QCIR-G14 %i\n" % (max(fmla_num.values()),))
 
-    if Glo.args.keep_var_names:
-        for (new_num, old_name) in Glo.var_num_to_name.items():
+    if options.keep_var_names:
+        for (new_num, old_name) in Glo.ctx.var_num_to_name.items():
             if str(new_num) == old_name:
                 continue
             outf.write("#VarName %3i : %s\n" % (new_num, old_name))
@@ -353,9 +453,9 @@ def write_qcir(self, prefix, outf):
             outf.write("# Nesting Level L%i\n" % (cur_nest_lev,))
             prev_nest_lev = cur_nest_lev
         def print_orig_gate_name():
-            if not(Glo.args.keep_gate_names):
+            if not(options.keep_gate_names):
                 return
-            orig_gate_names = Glo.gate_to_orig_names.get(subfmla, [])
+            orig_gate_names = Glo.ctx.gate_to_orig_names.get(subfmla, [])
             if len(orig_gate_names) == 0:
                 return
             if len(orig_gate_names) == 1 and orig_gate_names[0] == str(fmla_num[subfmla]):
@@ -368,10 +468,14 @@ def write_qcir(self, prefix, outf):
         outf.write("%i = %s(%s)\n" % (fmla_num[subfmla], op, args))
     outf.close()
 
-def write_dimacs(self, prefix, outf):
+def write_dimacs(self, prefix, outf, info=None, options=None):
+    # info is the DagInfo of self (computed if None), options the parsed
+    # command-line options (Glo.args if None).
+    if options is None:
+        options = Glo.args
     if type(outf) == str:
         with open(outf, 'wt') as f:
-            write_dimacs(self, prefix, f)
+            write_dimacs(self, prefix, f, info, options)
             return
     if (self in (Fmla_True, Fmla_False)):
         q = "e" if self == Fmla_True else "a"
@@ -382,7 +486,7 @@ def write_dimacs(self, prefix, outf):
         outf.close()
         return
 
-    nesting_info = get_subformula_print_ordering(self)
+    nesting_info = get_subformula_print_ordering(self, info)
     subformulas = [fmla for (order, fmla) in sorted((order, fmla) for (fmla, order) in nesting_info.items())]
     gate_num = calc_subfmla_nums(subformulas)
     subformulas = [x for x in subformulas if not is_lit(x)]
@@ -437,9 +541,9 @@ def write_dimacs(self, prefix, outf):
         p_num_clauses[0] += 1
 
     comment = ""
-    if Glo.args.keep_var_names:
+    if options.keep_var_names:
         VarNameLines = []
-        for (new_num, old_name) in Glo.var_num_to_name.items():
+        for (new_num, old_name) in Glo.ctx.var_num_to_name.items():
             if str(new_num) == old_name:
                 continue
             VarNameLines.append("c VarName %3i : %s\n" % (new_num, old_name))
@@ -492,7 +596,7 @@ def calc_subfmla_nums(subformulas):
                 del unassigned_nums[abs(x)]
     for fmla in subformulas:
         try:
-            name = Glo.gate_to_orig_names[fmla][0]
+            name = Glo.ctx.gate_to_orig_names[fmla][0]
             if name == str(int(name)) and (int(name) in unassigned_nums):
                 fmla_num[fmla] = int(name)
                 fmla_num[Fmla('not', fmla)] = -int(name)
@@ -511,53 +615,134 @@ def calc_subfmla_nums(subformulas):
     return fmla_num
 
 
-def get_subformula_print_ordering(fmla, nest_lev=None, p_next_idx=None):
+def get_subformula_print_ordering(fmla, info=None):
     # Determines the order in which the gate definitions are printed.
     # For QCIR, gates must be defined before they are used.
     # Subformulas are ordered by (nesting_level, index), where nesting_level is
     # the tree depth of the subformula and index is the order in which the
     # subformula was encountered in a depth-first search.
-    if nest_lev is None:
-        nest_lev = {}
-        p_next_idx = [1]
-    if is_lit(fmla):
-        cur_idx = p_next_idx[0]
-        p_next_idx[0] += 1
-        nest_lev[fmla] = (1, cur_idx)
-        return nest_lev
-    if len(fmla) == 1:
-        die("Unexpected constant: %r\n" % (fmla,))
-    if fmla in nest_lev:
-        return nest_lev
-    if fmla[0] == 'not':
-        return get_subformula_print_ordering(fmla[1], nest_lev, p_next_idx)
-    max_sub_level = 0
-    for arg in fmla[1:]:
-        get_subformula_print_ordering(arg, nest_lev, p_next_idx)
-        if isinstance(arg, tuple) and arg[0] == 'not':
-            arg_lev = nest_lev[arg[1]][0]
-        else:
-            arg_lev = nest_lev[arg][0]
-        max_sub_level = max(max_sub_level, arg_lev)
-    cur_idx = p_next_idx[0]
-    p_next_idx[0] += 1
-    nest_lev[fmla] = (max_sub_level + 1, cur_idx)
+    # Both are read from info, the DagInfo of fmla (computed if None).
+    if info is None:
+        info = DagInfo(fmla)
+    nest_lev = {}
+    for (idx, subfmla) in enumerate(info.order, 1):
+        if is_lit(subfmla):
+            nest_lev[subfmla] = (1, idx)
+            continue
+        if len(subfmla) == 1:
+            die("Unexpected constant: %r\n" % (subfmla,))
+        if subfmla[0] == 'not':
+            continue
+        nest_lev[subfmla] = (info.depth[subfmla], idx)
     return nest_lev
 
+
+def topological_order(fmla, known=()):
+    # Returns the subformulas of fmla (fmla included, each one once) that are
+    # not in known, every subformula after its arguments. Subformulas in known
+    # are not searched. Uses an explicit stack, so it runs in time linear in
+    # the size of the circuit whatever its depth.
+    order = []
+    seen = set()
+    stack = [(fmla, False)]
+    while stack:
+        (fmla, done) = stack.pop()
+        if done:
+            order.append(fmla)
+            continue
+        if fmla in seen or fmla in known:
+            continue
+        seen.add(fmla)
+        stack.append((fmla, True))
+        if not is_lit(fmla):
+            for arg in reversed(fmla[1:]):
+                stack.append((arg, False))
+    return order
+
+
+def strip_not(fmla):
+    # Returns the formula negated by fmla if fmla is a negation gate, fmla
+    # otherwise.
+    if isinstance(fmla, tuple) and fmla[0] == 'not':
+        return fmla[1]
+    return fmla
+
+class DagInfo(object):
+    # Facts about the circuit below a formula, all computed in a single pass
+    # over its subformulas in topological order (linear in the size of the
+    # DAG, shared subformulas being visited once):
+    #   order   - the subformulas, each one once, every one after its arguments
+    #   support - the set of variables occurring in the formula
+    #   depth   - the nesting level of every subformula (1 for a literal)
+    #   fanout  - the number of distinct gates using every subformula
+    #   refs    - the number of references to every subformula: its
+    #             occurrences as an argument, plus one for the root
+    # Negation gates are transparent: they have the depth of the formula they
+    # negate, and using ('not', g) counts as using g. The supports of the
+    # single gates are not kept, as their total size is quadratic on circuits
+    # such as the Type 2 ones.
+    # The passes of this script only read order, depth and support (so their
+    # output stays the one of the original script); fanout and refs are
+    # exposed for callers, e.g. to decide which gates may be inlined.
+    def __init__(self, fmla):
+        self.root = fmla
+        self.order = topological_order(fmla)
+        self.support = set()
+        self.depth = {}
+        self.fanout = {}
+        self.refs = {}
+        for subfmla in self.order:
+            self.fanout[subfmla] = 0
+            self.refs[subfmla] = 0
+            if is_lit(subfmla):
+                self.support.add(abs(subfmla))
+                self.depth[subfmla] = 1
+                continue
+            if subfmla[0] == 'not':
+                self.depth[subfmla] = self.depth[subfmla[1]]
+                continue
+            max_sub_level = 0
+            users = set()
+            for arg in subfmla[1:]:
+                arg = strip_not(arg)
+                max_sub_level = max(max_sub_level, self.depth[arg])
+                self.refs[arg] += 1
+                if arg not in users:
+                    users.add(arg)
+                    self.fanout[arg] += 1
+            self.depth[subfmla] = max_sub_level + 1
+        self.refs[strip_not(fmla)] += 1
+
 ##############################################################################
 
 
 class DeadExc(Exception):
     pass
 
-@memoized
-def simplify(fmla):
+def bottom_up(gate_fn, cache, fmla, info=None):
+    # Computes gate_fn(subfmla, args) for every subformula of fmla not yet in
+    # cache, in topological order (the one of info, the DagInfo of fmla, if
+    # given), where args are the results of its arguments. The results are
+    # kept in cache. Returns the result of fmla.
+    if info is None:
+        order = topological_order(fmla, cache)
+    else:
+        order = [x for x in info.order if x not in cache]
+    for subfmla in order:
+        args = () if is_lit(subfmla) else [cache[arg] for arg in subfmla[1:]]
+        cache[subfmla] = gate_fn(subfmla, args)
+    return cache[fmla]
+
+def simplify(fmla, info=None):
+    return bottom_up(simplify_gate, Glo.ctx.simplify_cache, fmla, info)
+
+def simplify_gate(fmla, args):
+    # Simplifies the gate fmla whose arguments simplify to args.
     if is_lit(fmla):
         return fmla
-    (op, args) = (fmla[0], fmla[1:])
+    op = fmla[0]
     if fmla in [Fmla_True, Fmla_False]:
         return fmla
-    args = [simplify(arg) for arg in args]
 
     if op in ('and', 'or'):
         if op == 'and':  (base, negbase) = (Fmla_True, Fmla_False)
@@ -612,19 +797,22 @@ def simplify(fmla):
         else: ret = Fmla(op, *args)
     else:
         die("Unknown operator: '%s'\n" % op)
-    orig_gate_names = Glo.gate_to_orig_names.get(fmla, None)
+    orig_gate_names = Glo.ctx.gate_to_orig_names.get(fmla, None)
     if orig_gate_names:
-        Glo.gate_to_orig_names[ret] = orig_gate_names
+        Glo.ctx.gate_to_orig_names[ret] = orig_gate_names
     return ret
 
-@memoized
-def to_andor(fmla):
+def to_andor(fmla, info=None):
+    return bottom_up(to_andor_gate, Glo.ctx.to_andor_cache, fmla, info)
+
+def to_andor_gate(fmla, args):
+    # Rewrites the gate fmla whose arguments are rewritten to args with only
+    # 'and', 'or' and 'not' gates.
     if is_lit(fmla):
         return fmla
-    (op, args) = (fmla[0], fmla[1:])
+    op = fmla[0]
     if len(args) == 0:
         return fmla
-    args = [to_andor(arg) for arg in args]
     if op in ('and', 'or', 'not'):
         ret = Fmla(op, *args)
     elif op == 'xor':
@@ -634,28 +822,52 @@ def to_andor(fmla):
         ret = Fmla('and', Fmla('or', negate(sel), y), Fmla('or', sel, z))
     else:
         die("Unknown operator: '%s'\n" % op)
-    orig_gate_names = Glo.gate_to_orig_names.get(fmla, None)
+    orig_gate_names = Glo.ctx.gate_to_orig_names.get(fmla, None)
     if orig_gate_names:
-        Glo.gate_to_orig_names[ret] = orig_gate_names
+        Glo.ctx.gate_to_orig_names[ret] = orig_gate_names
     return ret
 
 
-def vars_in_fmla(fmla, var_set=None, hit=None):
-    if (var_set is None):
-        var_set = set()
-        hit = set()
-    if fmla in hit: 
-        return var_set
-    if is_lit(fmla):
-        var_set.add(abs(fmla))
-        return var_set
-    args = fmla[1:]
-    for arg in args:
-        vars_in_fmla(arg, var_set, hit)
-    return var_set
+def vars_in_fmla(fmla, info=None):
+    if info is None:
+        info = DagInfo(fmla)
+    return info.support
 
     
 
+def convert(quant_prefix, fmla, outf, args):
+    # Simplifies fmla (rewritten with 'and' and 'or' gates only, unless
+    # args.native_ite) and writes it with the prefix onto outf (a path, or a
+    # seekable file object which is closed) in the format args.fmt.
+    if not(args.native_ite):
+        fmla = to_andor(fmla)
+
+    fmla = simplify(fmla)
+    info = None if fmla in (Fmla_True, Fmla_False) else DagInfo(fmla)
+
+    if args.fmt == 'qcir':
+        write_qcir(fmla, quant_prefix, outf, info, args)
+    else:
+        write_dimacs(fmla, quant_prefix, outf, info, args)
+
+def convert_int_circuit(prefix, gates, output_lit, outf, fmt='qdimacs',
+                        native_ite=False, max_nodes=None):
+    # Library entry point: converts a circuit given as integers (see
+    # read_int_circuit) in its own ConversionContext, as the command line
+    # converts the same circuit written in QCIR, but without writing and
+    # parsing any QCIR text. Raises a ValueError on a bad circuit and a
+    # MemoryError if the conversion needs more than max_nodes formula nodes.
+    # The options are passed down to the writers, so Glo.args is left as it
+    # is. Not thread-safe (see ConversionContext).
+    if fmt not in ('qcir', 'qdimacs'):
+        raise ValueError("unknown format '%s'" % (fmt,))
+    args = argparse.Namespace(keep_var_names=1, keep_gate_names=0,
+                              native_ite=int(native_ite), fmt=fmt)
+    with ConversionContext(max_nodes):
+        [quant_prefix, fmla] = read_int_circuit(prefix, gates, output_lit)
+        convert(quant_prefix, fmla, outf, args)
+
+
 def parse_args():
     parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter)
     parser.add_argument("input_file", type=str)
@@ -665,9 +877,11 @@ def parse_args():
     parser.add_argument("--keep-gate-names", choices=[0,1], type=int, default=0, dest="keep_gate_names")
     parser.add_argument("--native-ite", choices=[0,1], type=int, default=0, dest="native_ite",
         help="Use special 4-clause encoding for XOR and ITE gates")
-    parser.add_argument("--reclim", type=int, default=2000, help="recursion limit " + 
-        "(increase this if Python dies with 'RuntimeError: maximum recursion depth exceeded')")
+    parser.add_argument("--reclim", type=int, default=None, help="ignored " +
+        "(the traversals no longer recurse; kept for compatibility)")
     parser.add_argument("--fmt", type=str, help="output file format ('qcir', 'qdimacs')")
+    parser.add_argument("--max-nodes", type=int, default=None, dest="max_nodes",
+        help="maximum number of formula nodes (no limit by default)")
 
     args = parser.parse_args()
     return args
@@ -680,23 +894,15 @@ def main():
     if args.fmt is None:
         args.fmt = args.outfile.split('.')[-1]
 
-    sys.setrecursionlimit(args.reclim)
-
-    [quant_prefix, fmla] = read_qcir_file(args.input_file)
-    
-    orig_fmla = fmla
-
-    if not(args.native_ite):
-        fmla = to_andor(fmla)
-
-    fmla = simplify(fmla)
-
-    if args.fmt == 'qcir':
-        write_qcir(fmla, quant_prefix, args.outfile)
-    elif args.fmt == 'qdimacs':
-        write_dimacs(fmla, quant_prefix, args.outfile)
-    else:
+    if args.fmt not in ('qcir', 'qdimacs'):
         die("Unknown format '%s'.\nValid choices for '--fmt' option are 'qcir' and 'qdimacs'.\n" % (args.fmt,))
+
+    with ConversionContext(args.max_nodes):
+        try:
+            [quant_prefix, fmla] = read_qcir_file(args.input_file)
+            convert(quant_prefix, fmla, args.outfile, args)
+        except MemoryError as e:
+            die(str(e))
     return
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 from sys import argv
+from itertools import islice, chain
 
 #################### Noel Arteche (noel.arteche@gmail.com) ####################
 ################################ August 2019 ##################################
@@ -37,6 +38,26 @@ def generate_ChenType1(n):
 
     return phi
 
+def write_ChenType1(n, out):
+    """
+    Writes a Type 1 Chen Formula for the value n in QDIMACS directly onto a
+    file object, without ever building a QBF object or a list of clauses.
+    
+    -Input-: an integer n and a file object out opened for writing
+    -Precondition-: n ≥ 1
+    -Output-: -
+    -Postcondition-: the Chen Formula of Type 1 for size n has been written
+    onto out, exactly as generate_ChenType1(n).write_QDIMACS(out) would do.
+    -Cost-: Θ(n) time, Θ(1) memory
+    """
+    
+    num_vars = 9*n + 4
+    num_clauses = 12*n + 6
+    
+    clauses = chain(iter_B_clauses(n), iter_H_clauses(n), iter_T_clauses(n))
+    write_QDIMACS(out, "type1_size{}".format(n), num_vars, num_clauses,
+                  iter_quantifier_blocks(n), clauses)
+
 ###############################################################################
 ###############################################################################
 
@@ -189,8 +210,118 @@ def generate_T_clauses(phi, n):
 
         for C in T_i:
             phi.add_clause(C)
-            
+
+# ================= Closed-form functions for direct emission ================ #
+
+def x_index(i, j, k):
+    """
+    Closed form of encoding_to_index((i, str(j) + str(k), 'np')).
+    """
+    
+    return 2*j + k + 1 if i == 0 else 9*i + 2*j + k - 4
+
+def x_prime_index(i, j, k):
+    """
+    Closed form of encoding_to_index((i, str(j) + str(k), 'p')).
+    """
+    
+    return 9*i + 2*j + k
+
+def y_index(i):
+    """
+    Closed form of encoding_to_index((i, None, 'y')).
+    """
+    
+    return 9*i + 4
+
+def iter_quantifier_blocks(n):
+    """
+    Yields the quantifier blocks of a Chen Formula of Type 1 and size n, in the
+    same order as generate_quantifier_blocks.
+    
+    -Cost-: Θ(n)
+    """
+    
+    yield ['e', [1, 2, 3, 4]]
+    for i in range(1, n + 1):
+        yield ['e', [x_prime_index(i, j, k) for j in (0, 1) for k in (0, 1)]]
+        yield ['a', [y_index(i)]]
+        yield ['e', [x_index(i, j, k) for j in (0, 1) for k in (0, 1)]]
+
+def iter_B_clauses(n):
+    """
+    Yields the B-clauses in the same order as generate_B_clauses.
+    
+    -Cost-: Θ(1)
+    """
+    
+    for j in (0, 1):
+        for k in (0, 1):
+            yield (-x_index(0, j, k),)
+    
+    for j in (0, 1):
+        yield (x_index(n, j, 0), x_index(n, j, 1))
+
+def iter_H_clauses(n):
+    """
+    Yields the H-clauses in the same order as generate_H_clauses.
+    
+    -Cost-: Θ(n)
+    """
+    
+    for i in range(1, n + 1):
+        for j in (0, 1):
+            x_0 = x_index(i - 1, j, 0)
+            x_1 = x_index(i - 1, j, 1)
+            for k in (0, 1):
+                for l in (0, 1):
+                    yield (-x_prime_index(i, 0, k), -x_prime_index(i, 1, l), x_0, x_1)
+
+def iter_T_clauses(n):
+    """
+    Yields the T-clauses in the same order as generate_T_clauses.
+    
+    -Cost-: Θ(n)
+    """
+    
+    for i in range(1, n + 1):
+        y = y_index(i)
+        for k in (0, 1):
+            yield (-x_index(i, 0, k), y, x_prime_index(i, 0, k))
+        for k in (0, 1):
+            yield (-x_index(i, 1, k), -y, x_prime_index(i, 1, k))
+
 # =================== Internal representation for formulas ================== #
+CHUNK_SIZE = 8192 # number of lines buffered before each write
+
+def write_QDIMACS(out, name, n, m, prefix, clauses, chunk_size=CHUNK_SIZE):
+    """
+    Writes a formula in the QDIMACS format directly onto a file object, in
+    chunks of at most chunk_size lines, so that the text of the whole formula
+    is never held in memory at once.
+    """
+    
+    out.write("c " + name + "\n") #identifier
+    out.write("c num. vars.: {}".format(n) + "\n")
+    out.write("c num. clauses.: {}".format(m) + "\n")
+    out.write("p cnf {} {}\n".format(n, m))
+
+    blocks = iter(prefix)
+    while True:
+        chunk = "".join([" ".join([B[0]] + [str(var) for var in B[1]] + ["0\n"])
+                         for B in islice(blocks, chunk_size)])
+        if not chunk:
+            break
+        out.write(chunk)
+
+    clauses = iter(clauses)
+    while True:
+        chunk = "".join([" ".join(map(str, C)) + " 0\n"
+                         for C in islice(clauses, chunk_size)])
+        if not chunk:
+            break
+        out.write(chunk)
+
 ###############################################################################
 #================================= QBF Class =================================#
 ###############################################################################
@@ -257,10 +388,15 @@ class QBF:
     
     convert()
         Converts the formula to a string in the QDIMACS format.
+    
+    write_QDIMACS(out, chunk_size=CHUNK_SIZE)
+        Writes the formula in QDIMACS directly onto the file object out,
+        without building the whole text in memory.
         
-    print_formula(mode='default', output='stdIO', filename=None)
+    print_formula(mode='default', output='stdIO', filename=None, stream=True)
         Prints the formula in the specified mode (normal for 'default' or QDIMACS
         or QCIR otherwise), either in the standard output or onto a text file.
+        QDIMACS files are streamed with write_QDIMACS unless stream is False.
         
     """
 
@@ -338,7 +474,16 @@ class QBF:
 
         return converted
 
-    def print_formula(self, mode='default', output='stdIO', filename=None):
+    def write_QDIMACS(self, out, chunk_size=CHUNK_SIZE):
+        """
+        Writes the formula in the QDIMACS format onto the file object out, in
+        buffered chunks instead of a single string.
+        """
+        
+        write_QDIMACS(out, self.get_name(), self.get_n_vars(), self.get_n_clauses(),
+                      self.get_prefix(), self.get_clauses(), chunk_size)
+
+    def print_formula(self, mode='default', output='stdIO', filename=None, stream=True):
         """
         Prints the formula in the desired format.
         
@@ -352,8 +497,19 @@ class QBF:
                         include the desired extension. If a name is not
                         specified, the name will be formed using the name of the
                         formula.
+            - stream: if True, QDIMACS files are written in chunks with
+                      write_QDIMACS instead of being converted to a single
+                      string first.
         """
         
+        if stream and mode == 'QDIMACS' and output == "file":
+            if filename == None: # default filename
+                filename = self.name + ".qdimacs"
+            file = open(filename, 'w')
+            self.write_QDIMACS(file)
+            file.close()
+            return
+        
         result = ""
         
         # Convert the formula to a string.
@@ -432,8 +588,14 @@ def run_generator():
         return
     else:
         n, form, out, filename = args[0], args[1], args[2], args[3]
-        phi = generate_ChenType1(n)
-        phi.print_formula(form, out, filename)
+        if out == "file":
+            # emit the formula directly, without building the QBF object
+            file = open(filename, 'w')
+            write_ChenType1(n, file)
+            file.close()
+        else:
+            phi = generate_ChenType1(n)
+            phi.print_formula(form, out, filename)
     
 def read_arguments():
     
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Imports:
+from generators.generator_for_T1 import write_ChenType1
+from generators.generator_for_T2 import write_ChenType2_QCIR, write_ChenType2_QDIMACS
+from tools.system_tools import open_output
+from time import time
+import shutil
+import os
+
+GENERATOR_VERSION = 1 # to be increased whenever the output of a writer changes
+
+# Writer and path (relative to the output directory) of every format:
+FORMATS = {
+    'T1-QDIMACS': (write_ChenType1, "type1/type1_size{}.qdimacs"),
+    'T2-QCIR': (write_ChenType2_QCIR, "type2/QCIR/type2_size{}_circuit.qcir"),
+    'T2-QDIMACS': (write_ChenType2_QDIMACS, "type2/QDIMACS/type2_size{}_cnf.qdimacs"),
+}
+
+###############################################################################
+#============================== BATCH GENERATOR ==============================#
+###############################################################################
+
+def generate_batch(sizes, formats=tuple(FORMATS), output_dir="./final_formulas", verbose=True,
+                   cache=None, compression=""):
+    """
+    Generates the instances of every format for every size in one process.
+
+    NOTE: every instance is streamed onto its file by the direct writers of the
+          generators, so no formula is ever materialized and the interpreter is
+          started only once for the whole batch.
+
+    -Input-: an iterable of sizes, an iterable of formats (keys of FORMATS),
+    the directory where the instances are written, whether to print the
+    progress, an InstanceCache to take the instances from (None to always
+    generate them) and a compression suffix appended to every path ('.gz',
+    '.bz2', '.xz', '.zst' or '' for plain text, see open_output)
+    -Precondition-: every size is ≥ 1
+    -Output-: a list of tuples (format, n, path, seconds), one per instance
+    -Postcondition-: every instance has been written onto the path given by
+    FORMATS inside output_dir, creating the directories when needed.
+    -Cost-: Θ(total size of the instances)
+    """
+
+    for form in formats:
+        if form not in FORMATS:
+            raise ValueError("unknown format '{}'".format(form))
+
+    report = list()
+    for n in sizes:
+        if verbose:
+            print("Generating n = {}...".format(n))
+        for form in formats:
+            path, t = generate_instance(form, n, output_dir, cache, compression)
+            report.append((form, n, path, t))
+    return report
+
+def generate_instance(form, n, output_dir, cache=None, compression=""):
+    """
+    Writes the instance of format form and size n inside output_dir and
+    returns its path and the time taken in seconds. The compression suffix
+    is appended to the path and selects the compression of the file.
+
+    If a cache is given, the instance is taken from it (and generated into it
+    if missing) and then hard-linked, or copied, onto its path. It is fetched
+    again if another process evicts it in between.
+    """
+
+    path = os.path.join(output_dir, FORMATS[form][1].format(n)) + compression
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    if cache is None:
+        return path, write_instance(form, n, path)
+
+    t0 = time()
+    tmp_path = get_tmp_path(path)
+    while True:
+        cached = cache.fetch(form, n, compression)
+        try:
+            try:
+                os.link(cached, tmp_path)
+            except FileNotFoundError:
+                raise
+            except OSError: # e.g. another file system
+                shutil.copyfile(cached, tmp_path)
+        except FileNotFoundError: # evicted by another process
+            continue
+        break
+    os.replace(tmp_path, path)
+    return path, time() - t0
+
+def write_instance(form, n, path):
+    """
+    Writes the instance of format form and size n onto path and returns the
+    time taken in seconds.
+
+    The instance is written onto a temporary file in the same directory and
+    then renamed, so a file with the final name is always complete. The file
+    is compressed according to the suffix of path (see open_output).
+    """
+
+    write = FORMATS[form][0]
+    tmp_path = get_tmp_path(path)
+
+    t0 = time()
+    try:
+        file = open_output(tmp_path)
+        write(n, file)
+        file.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return time() - t0
+
+def get_tmp_path(path):
+    """
+    Returns the path of the temporary file used by this process to write
+    path; it keeps the suffix of path and its name contains '.tmp'.
+    """
+
+    folder, name = os.path.split(path)
+    return os.path.join(folder, ".tmp{}.{}".format(os.getpid(), name))
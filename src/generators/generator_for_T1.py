@@ -2,7 +2,8 @@
 # -*- coding: utf-8 -*-
 
 # Imports:
-from instance_encodings.QBF import QBF
+from instance_encodings.QBF import QBF, write_QDIMACS
+from itertools import chain
 
 ###############################################################################
 #============================ GENERATOR FOR TYPE 1 ===========================#
@@ -36,6 +37,28 @@ def generate_ChenType1(n):
 
     return phi
 
+def write_ChenType1(n, out):
+    """
+    Writes a Type 1 Chen Formula for the value n in QDIMACS directly onto a
+    file object, without ever building a QBF object or a list of clauses.
+    
+    NOTE: the prefix and the clauses are computed on the fly from the
+          closed-form indices of the variables and streamed onto out.
+    
+    -Input-: an integer n and a file object out opened for writing
+    -Precondition-: n ≥ 1
+    -Output-: -
+    -Postcondition-: the Chen Formula of Type 1 for size n has been written
+    onto out, exactly as generate_ChenType1(n).write_QDIMACS(out) would do.
+    -Cost-: Θ(n) time, Θ(1) memory
+    """
+    
+    num_vars = 9*n + 4
+    num_clauses = 12*n + 6
+    
+    clauses = chain(iter_B_clauses(n), iter_H_clauses(n), iter_T_clauses(n))
+    write_QDIMACS(out, num_vars, num_clauses, iter_quantifier_blocks(n), clauses)
+
 ###############################################################################
 ###############################################################################
 
@@ -187,4 +210,84 @@ def generate_T_clauses(phi, n):
             T_i.append(new_clause)
 
         for C in T_i:
-            phi.add_clause(C)
\ No newline at end of file
+            phi.add_clause(C)
+
+# ================= Closed-form functions for direct emission ================ #
+
+def x_index(i, j, k):
+    """
+    Closed form of encoding_to_index((i, str(j) + str(k), 'np')).
+    """
+    
+    return 2*j + k + 1 if i == 0 else 9*i + 2*j + k - 4
+
+def x_prime_index(i, j, k):
+    """
+    Closed form of encoding_to_index((i, str(j) + str(k), 'p')).
+    """
+    
+    return 9*i + 2*j + k
+
+def y_index(i):
+    """
+    Closed form of encoding_to_index((i, None, 'y')).
+    """
+    
+    return 9*i + 4
+
+def iter_quantifier_blocks(n):
+    """
+    Yields the quantifier blocks of a Chen Formula of Type 1 and size n, in the
+    same order as generate_quantifier_blocks.
+    
+    -Cost-: Θ(n)
+    """
+    
+    yield ['e', [1, 2, 3, 4]]
+    for i in range(1, n + 1):
+        yield ['e', [x_prime_index(i, j, k) for j in (0, 1) for k in (0, 1)]]
+        yield ['a', [y_index(i)]]
+        yield ['e', [x_index(i, j, k) for j in (0, 1) for k in (0, 1)]]
+
+def iter_B_clauses(n):
+    """
+    Yields the B-clauses in the same order as generate_B_clauses.
+    
+    -Cost-: Θ(1)
+    """
+    
+    for j in (0, 1):
+        for k in (0, 1):
+            yield (-x_index(0, j, k),)
+    
+    for j in (0, 1):
+        yield (x_index(n, j, 0), x_index(n, j, 1))
+
+def iter_H_clauses(n):
+    """
+    Yields the H-clauses in the same order as generate_H_clauses.
+    
+    -Cost-: Θ(n)
+    """
+    
+    for i in range(1, n + 1):
+        for j in (0, 1):
+            x_0 = x_index(i - 1, j, 0)
+            x_1 = x_index(i - 1, j, 1)
+            for k in (0, 1):
+                for l in (0, 1):
+                    yield (-x_prime_index(i, 0, k), -x_prime_index(i, 1, l), x_0, x_1)
+
+def iter_T_clauses(n):
+    """
+    Yields the T-clauses in the same order as generate_T_clauses.
+    
+    -Cost-: Θ(n)
+    """
+    
+    for i in range(1, n + 1):
+        y = y_index(i)
+        for k in (0, 1):
+            yield (-x_index(i, 0, k), y, x_prime_index(i, 0, k))
+        for k in (0, 1):
+            yield (-x_index(i, 1, k), -y, x_prime_index(i, 1, k))
@@ -2,21 +2,26 @@
 # -*- coding: utf-8 -*-
 
 # Imports:
-from instance_encodings.QBC import QBC
-from itertools import combinations
+from instance_encodings.QBC import QBC, AND, OR, write_QCIR, write_Tseitin_QDIMACS
 
 ###############################################################################
-#========================== SLOW GENERATOR FOR TYPE 2 ========================#
+#============================ GENERATOR FOR TYPE 2 ===========================#
 ###############################################################################
 
-def generate_ChenType2(n):
+def generate_ChenType2(n, names=None):
     """
     Generates a Type 2 Chen Formula for the value n.
     
     NOTE: this is the only function in this module that should be invoked
           outside of it.
     
-    -Input-: an integer n
+    NOTE: the identifiers of the variables and gates are computed directly
+          from their position in the circuit (see the layout below). If a
+          dictionary is given in names, it is filled with the symbolic name
+          of every variable and gate ('x1', 's_2_0', 'aux_3_1_2', ...) mapped
+          to its identifier, for debugging and tracing purposes.
+    
+    -Input-: an integer n and, optionally, a dictionary names
     -Precondition-: n ≥ 1
     -Output-: a QBC object
     -Postcondition-: the formula returned is a Chen Formula of Type 2 for size n
@@ -24,26 +29,74 @@ def generate_ChenType2(n):
     """
     
     num_vars = 2*n
-    num_gates = 15*n - 11
-    phi = QBC(num_vars, num_gates, name="type2_size{}".format(n))
+    num_gates = 17*n - 12
+    phi = QBC(num_vars, num_gates, name="type2_size{}".format(n), int_gates=True)
     
-    names_to_ints = [{}, 0]
-    
-    generate_quantifier_blocks(phi, n, names_to_ints)
-    generate_gates(phi, n, names_to_ints)
+    generate_quantifier_blocks(phi, n, names)
+    generate_gates(phi, n, names)
 
     return phi
 
+def write_ChenType2_QDIMACS(n, out):
+    """
+    Writes the Tseitin transformation of a Type 2 Chen Formula for the value n
+    in QDIMACS directly onto a file object, without building the circuit.
+    
+    NOTE: the gates are produced on the fly by iter_gates and their variables
+          are their identifiers in the circuit, so the CNF is the one of
+          generate_ChenType2(n).write_QDIMACS(out) up to a renaming of the
+          auxiliary variables.
+    
+    -Input-: an integer n and a file object out opened for writing
+    -Precondition-: n ≥ 1
+    -Output-: -
+    -Postcondition-: the CNF of the Chen Formula of Type 2 for size n has been
+    written onto out.
+    -Cost-: Θ(n) time, Θ(1) memory
+    """
+    
+    num_vars = 2*n
+    num_gates = 17*n - 12
+    num_inputs = 37*n - 27
+    
+    write_Tseitin_QDIMACS(out, num_vars, num_gates, num_inputs, iter_quantifier_blocks(n),
+                          iter_gates(n), get_output_gate(n))
+
+def write_ChenType2_QCIR(n, out):
+    """
+    Writes a Type 2 Chen Formula for the value n in QCIR directly onto a file
+    object, without building the circuit.
+    
+    -Input-: an integer n and a file object out opened for writing
+    -Precondition-: n ≥ 1
+    -Output-: -
+    -Postcondition-: out contains the same text as generate_ChenType2(n).convert().
+    -Cost-: Θ(n) time, Θ(1) memory
+    """
+    
+    write_QCIR(out, "type2_size{}".format(n), 2*n, 17*n - 12, iter_quantifier_blocks(n),
+               get_output_gate(n), iter_gates(n))
+
 ###############################################################################
 ###############################################################################
 
 # =================== Internal functions for the generator ================== #
 
-def generate_quantifier_blocks(phi, n, names_to_ints):
+# Layout of the identifiers, with N = 2n:
+#
+#   x_i = 2i - 1, y_i = 2i                                     (1 ≤ i ≤ n)
+#   s_1_m = N + 1 + m, xor_1 = N + 4, xor_2 = N + 5            (0 ≤ m ≤ 2)
+#
+# and, for every layer 2 ≤ k ≤ n, with b = N + 5 + 17(k - 2):
+#
+#   adder_k_r = b + 1 + r, xor_1_k = b + 4, xor_2_k = b + 5    (0 ≤ r ≤ 2)
+#   aux_k_m_r = b + 6 + 4m + r, s_k_m = b + 9 + 4m             (0 ≤ m, r ≤ 2)
+
+def generate_quantifier_blocks(phi, n, names=None):
     """
     Generates the quantifier block on phi.
     
-    -Input-: a QBC object phi and an integer n
+    -Input-: a QBC object phi, an integer n and, optionally, a dictionary names
     -Precondition-: n ≥ 1
     -Output-: -
     -Postcondition-: the phi QBC object is updated with the prefix quantifier
@@ -51,128 +104,122 @@ def generate_quantifier_blocks(phi, n, names_to_ints):
     -Cost-: Θ(n)
     """
     
-    dic = names_to_ints[0]
-    counter = names_to_ints[1]
+    for B in iter_quantifier_blocks(n):
+        phi.add_quantifier_block(B[0], B[1])
+    
+    if names is not None:
+        for i in range(1, n + 1):
+            names['x' + str(i)] = 2*i - 1
+            names['y' + str(i)] = 2*i
+
+def iter_quantifier_blocks(n):
+    """
+    Yields the quantifier blocks ∃x_1 ∀y_1 ... ∃x_n ∀y_n, with x_i = 2i - 1
+    and y_i = 2i.
+    
+    -Cost-: Θ(n)
+    """
     
     for i in range(1, n + 1):
-        counter += 1
-        dic['x' + str(i)] = str(counter)
-        phi.add_quantifier_block('e', [str(counter)])
-        
-        counter += 1
-        dic['y' + str(i)] = str(counter)
-        phi.add_quantifier_block('a', [str(counter)])
+        yield ['e', [2*i - 1]]
+        yield ['a', [2*i]]
         
-    names_to_ints[1] = counter
-        
-def generate_gates(phi, n, names_to_ints):
+def generate_gates(phi, n, names=None):
     """
     Generates the gates on the circuit.
     
-    -Input-: a QBC object phi and an integer n
+    -Input-: a QBC object phi, an integer n and, optionally, a dictionary names
     -Precondition-: n ≥ 1
     -Output-: -
     -Postcondition-: the phi QBC object is updated with the appropriate gates
     of a Chen Formula of Type 2 and size n.
     -Cost-: Θ(n)
     """
-        
-    dic = names_to_ints[0]
-    counter = names_to_ints[1]
     
-    s_1_0 = 's_{}_{}'.format(1, 0)
-    s_1_1 = 's_{}_{}'.format(1, 1)
-    s_1_2 = 's_{}_{}'.format(1, 2)
+    add_gate = phi.add_int_gate
+    for c, op, X in iter_gates(n):
+        add_gate(c, op, X)
     
-    counter += 1
-    dic[s_1_0] = str(counter)
-    counter += 1
-    dic[s_1_1] = str(counter)
-    counter += 1
-    dic[s_1_2] = str(counter)
+    phi.set_output_gate(get_output_gate(n))
     
-    xor_1 = 'xor_1'
-    xor_2 = 'xor_2'
+    if names is not None:
+        generate_gate_names(n, names)
+
+def iter_gates(n):
+    """
+    Yields the gates of a Chen Formula of Type 2 and size n in definition
+    order, as tuples (identifier, operation, inputs).
+    
+    -Input-: an integer n
+    -Precondition-: n ≥ 1
+    -Output-: a generator of gates
+    -Postcondition-: every gate is yielded after the gates it uses as inputs.
+    -Cost-: Θ(n)
+    """
     
-    counter += 1
-    dic[xor_1] = str(counter)
-    counter += 1
-    dic[xor_2] = str(counter)
+    N = 2*n
     
-    phi.add_gate(dic[s_1_0], 'and', ['-' + dic['x1'], '-' + dic['y1']])
+    # first layer: s_1 counts x_1 + y_1
+    yield N + 1, AND, [-1, -2]
+    yield N + 4, AND, [1, -2]
+    yield N + 5, AND, [-1, 2]
+    yield N + 2, OR, [N + 4, N + 5]
+    yield N + 3, AND, [1, 2]
     
-    #phi.add_gate(dic[s_1_1], 'xor', [dic['x1'], dic['y1']])
-    phi.add_gate(dic[xor_1], 'and', [dic['x1'], '-' + dic['y1']])
-    phi.add_gate(dic[xor_2], 'and', ['-' + dic['x1'], dic['y1']])
-    phi.add_gate(dic[s_1_1], 'or', [dic[xor_1], dic[xor_2]])
+    s = (N + 1, N + 2, N + 3) # s_{k-1}_0, s_{k-1}_1, s_{k-1}_2
     
-    phi.add_gate(dic[s_1_2], 'and', [dic['x1'], dic['y1']])
-
     for k in range(2, n + 1):
+        b = N + 5 + 17*(k - 2)
+        x, y = 2*k - 1, 2*k
+        adder = (b + 1, b + 2, b + 3)
         
-        adder_k_0 = 'adder_{}_{}'.format(k, 0)
-        adder_k_1 = 'adder_{}_{}'.format(k, 1)
-        adder_k_2 = 'adder_{}_{}'.format(k, 2)
+        # adder_k counts x_k + y_k
+        yield b + 4, AND, [x, -y]
+        yield b + 5, AND, [-x, y]
+        yield b + 1, AND, [-x, -y]
+        yield b + 2, OR, [b + 4, b + 5]
+        yield b + 3, AND, [x, y]
         
-        counter += 1
-        dic[adder_k_0] = str(counter)
-        counter += 1
-        dic[adder_k_1] = str(counter)
-        counter += 1
-        dic[adder_k_2] = str(counter)
+        # s_k_m holds iff s_{k-1}_r and adder_k_{(m - r) mod 3} for some r
+        for m in [0, 1, 2]:
+            g = b + 6 + 4*m
+            yield g, AND, [s[0], adder[m % 3]]
+            yield g + 1, AND, [s[1], adder[(m - 1) % 3]]
+            yield g + 2, AND, [s[2], adder[(m - 2) % 3]]
+            yield g + 3, OR, [g, g + 1, g + 2]
         
-        xor_1_k = 'xor_1_{}'.format(k)
-        xor_2_k = 'xor_2_{}'.format(k)
+        s = (b + 9, b + 13, b + 17)
+
+def get_output_gate(n):
+    """
+    Returns the output literal, the negation of s_n_{n mod 3}.
     
-        counter += 1
-        dic[xor_1_k] = str(counter)
-        counter += 1
-        dic[xor_2_k] = str(counter)
-        
-        phi.add_gate(dic[xor_1_k], 'and', [dic['x' + str(k)], '-' + dic['y' + str(k)]])
-        phi.add_gate(dic[xor_2_k], 'and', ['-' + dic['x' + str(k)], dic['y' + str(k)]])
-        
-        phi.add_gate(dic[adder_k_0], 'and', ['-' + dic['x' + str(k)], '-' + dic['y' + str(k)]])
-        phi.add_gate(dic[adder_k_1], 'or', [dic[xor_1_k], dic[xor_2_k]])
-        phi.add_gate(dic[adder_k_2], 'and', [dic['x' + str(k)], dic['y' + str(k)]])
-        
-        
-#        phi.add_gate(adder_k_0, 'and', ['-x' + str(k), '-y' + str(k)])
-#        phi.add_gate(adder_k_1, 'xor', ['x' + str(k), 'y' + str(k)])
-#        phi.add_gate(adder_k_2, 'and', ['x' + str(k), 'y' + str(k)])
-        
+    -Cost-: Θ(1)
+    """
+    
+    if n == 1:
+        return -(2*n + 1 + n % 3)
+    return -(2*n + 5 + 17*(n - 2) + 9 + 4*(n % 3))
+
+def generate_gate_names(n, names):
+    """
+    Fills the dictionary names with the symbolic name of every gate mapped to
+    its identifier.
+    
+    -Cost-: Θ(n)
+    """
+    
+    N = 2*n
+    names.update({'s_1_0': N + 1, 's_1_1': N + 2, 's_1_2': N + 3,
+                  'xor_1': N + 4, 'xor_2': N + 5})
+    
+    for k in range(2, n + 1):
+        b = N + 5 + 17*(k - 2)
+        for r in [0, 1, 2]:
+            names['adder_{}_{}'.format(k, r)] = b + 1 + r
+        names['xor_1_{}'.format(k)] = b + 4
+        names['xor_2_{}'.format(k)] = b + 5
         for m in [0, 1, 2]:
-            
-            aux_k_0 = 'aux_{}_{}_{}'.format(k, m, 0)
-            aux_k_1 = 'aux_{}_{}_{}'.format(k, m, 1)
-            aux_k_2 = 'aux_{}_{}_{}'.format(k, m, 2)
-            
-            counter += 1
-            dic[aux_k_0] = str(counter)
-            counter += 1
-            dic[aux_k_1] = str(counter)
-            counter += 1
-            dic[aux_k_2] = str(counter)
-            
-            if m == 0:
-                phi.add_gate(dic[aux_k_0], 'and', [dic['s_{}_0'.format(k-1)], dic['adder_{}_0'.format(k)]])
-                phi.add_gate(dic[aux_k_1], 'and', [dic['s_{}_1'.format(k-1)], dic['adder_{}_2'.format(k)]])
-                phi.add_gate(dic[aux_k_2], 'and', [dic['s_{}_2'.format(k-1)], dic['adder_{}_1'.format(k)]])
-            elif m == 1:
-                phi.add_gate(dic[aux_k_0], 'and', [dic['s_{}_0'.format(k-1)], dic['adder_{}_1'.format(k)]])
-                phi.add_gate(dic[aux_k_1], 'and', [dic['s_{}_1'.format(k-1)], dic['adder_{}_0'.format(k)]])
-                phi.add_gate(dic[aux_k_2], 'and', [dic['s_{}_2'.format(k-1)], dic['adder_{}_2'.format(k)]])
-            else:
-                phi.add_gate(dic[aux_k_0], 'and', [dic['s_{}_0'.format(k-1)], dic['adder_{}_2'.format(k)]])
-                phi.add_gate(dic[aux_k_1], 'and', [dic['s_{}_1'.format(k-1)], dic['adder_{}_1'.format(k)]])
-                phi.add_gate(dic[aux_k_2], 'and', [dic['s_{}_2'.format(k-1)], dic['adder_{}_0'.format(k)]])
-                
-            s_k_m = 's_{}_{}'.format(k, m)
-            counter += 1
-            dic[s_k_m] = str(counter)
-            phi.add_gate(dic[s_k_m], 'or', [dic[aux_k_0], dic[aux_k_1], dic[aux_k_2]])
-    
-    
-    phi.set_output_gate('-' + dic['s_{}_{}'.format(n, n % 3)])
-    # phi.set_output_gate('-s_{}_{}'.format(n, n % 3))
-                
\ No newline at end of file
+            for r in [0, 1, 2]:
+                names['aux_{}_{}_{}'.format(k, m, r)] = b + 6 + 4*m + r
+            names['s_{}_{}'.format(k, m)] = b + 9 + 4*m
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Imports:
+from generators.batch_generator import FORMATS, GENERATOR_VERSION, write_instance
+from hashlib import sha256
+import fcntl
+import os
+
+###############################################################################
+#============================ InstanceCache Class ============================#
+###############################################################################
+
+class InstanceCache:
+    """
+    An on-disk cache of generated instances.
+
+    The generators are deterministic, so an instance is fully determined by
+    its family (T1 or T2), its size n, its format (QDIMACS or QCIR), its
+    compression suffix (see open_output) and the version of the generators.
+    Every instance is stored under the SHA-256 of that key, so different
+    versions never collide, and the least recently used instances are evicted
+    once the total size of the cache exceeds max_size.
+
+    Several processes may share a cache (e.g. the workers of build_suite):
+    the total size is recomputed from the disk after every generation and
+    the evictions are serialized by a lock file in root.
+
+    NOTE: generate_instance hard-links the cached instances into its output
+          directory, so evicting such an instance only removes its entry in
+          the cache: its disk space is not freed while the linked copy
+          exists.
+
+
+    Attributes
+    ----------
+    root : str
+        the directory holding the cached instances
+    max_size : int
+        the maximum total size in bytes of the cached instances
+    version : int
+        the version of the generators, part of the key of every instance
+    size : int
+        the total size in bytes of the cached instances, as known by this
+        object (it is recomputed from the disk when evicting)
+
+    Methods
+    -------
+    get_key(form, n, compression="")
+        Returns the hexadecimal key of the instance of format form (a key of
+        FORMATS) and size n, compressed according to the given suffix.
+
+    get_path(form, n, compression="")
+        Returns the path where that instance is stored in the cache.
+
+    get(form, n, compression="")
+        Returns the path of the cached instance, or None if it is not cached.
+
+    fetch(form, n, compression="")
+        Returns the path of the cached instance, generating it first if it is
+        not cached.
+
+    evict(keep=None)
+        Removes the least recently used instances (but keep) until the total
+        size of the cache on disk is not greater than max_size.
+
+    scan()
+        Yields a tuple (path, size, last use) for every cached instance.
+
+    """
+
+    def __init__(self, root="./output_files/cache", max_size=10 << 30,
+                 version=GENERATOR_VERSION):
+        self.root = root
+        self.max_size = max_size
+        self.version = version
+        os.makedirs(root, exist_ok=True)
+        self.size = sum([size for _, size, _ in self.scan()])
+
+    def get_key(self, form, n, compression=""):
+        family, encoding = form.split('-')
+        key = "{}|{}|{}|{}|{}".format(family, n, encoding, compression, self.version)
+        return sha256(key.encode()).hexdigest()
+
+    def get_path(self, form, n, compression=""):
+        key = self.get_key(form, n, compression)
+        ext = os.path.splitext(FORMATS[form][1])[1] + compression
+        return os.path.join(self.root, key[:2], key + ext)
+
+    def get(self, form, n, compression=""):
+        path = self.get_path(form, n, compression)
+        try:
+            os.utime(path) # the modification time records the last use
+        except FileNotFoundError:
+            return None
+        return path
+
+    def fetch(self, form, n, compression=""):
+        path = self.get(form, n, compression)
+        if path is not None:
+            return path
+
+        path = self.get_path(form, n, compression)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_instance(form, n, path)
+        # other processes may have filled the cache too: the size is checked
+        # on the disk rather than with the local count
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        with open(os.path.join(self.root, ".lock"), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX) # released when closed
+            entries = sorted(self.scan(), key=lambda entry: entry[2])
+            self.size = sum([size for _, size, _ in entries])
+            for path, size, _ in entries:
+                if self.size <= self.max_size:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                self.size -= size
+
+    def scan(self):
+        """
+        Yields a tuple (path, size, last use) for every cached instance.
+        """
+
+        for folder in os.scandir(self.root):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if '.tmp' in entry.name: # being written
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
@@ -2,36 +2,72 @@
 # -*- coding: utf-8 -*-
 
 # Imports:
-from instance_encodings.QBF import QBF
+from instance_encodings.QBF import QBF, write_QDIMACS
 from itertools import combinations
+from math import comb
 
 ###############################################################################
 #========================== SLOW GENERATOR FOR TYPE 2 ========================#
 ###############################################################################
 
-def generate_ChenType2(n):
+def generate_ChenType2(n, encoding='exponential'):
     """
     Generates a Type 2 Chen Formula for the value n.
     
     NOTE: this is the only function in this module that should be invoked
           outside of it.
     
-    -Input-: an integer n
+    NOTE: with encoding='exponential' the matrix has one clause for every
+          assignment whose number of true variables is congruent with n mod 3.
+          With encoding='counter' it is replaced by a logically equivalent CNF
+          of size Θ(n) that counts the true variables modulo 3 with auxiliary
+          existential variables, innermost in the prefix.
+    
+    -Input-: an integer n and the encoding ('exponential' or 'counter')
     -Precondition-: n ≥ 1
     -Output-: a QBF object
     -Postcondition-: the formula returned is a Chen Formula of Type 2 for size n
-    -Cost-: Θ(4^n)
+    -Cost-: Θ(4^n) for the exponential encoding, Θ(n) for the counter encoding
     """
     
     num_vars = 2*n
     num_clauses = 0 # to be updated later
+    
+    if encoding == 'counter':
+        num_vars = 8*n + 3
+        num_clauses = 24*n + 4
+    elif encoding != 'exponential':
+        raise ValueError("unknown encoding '{}'".format(encoding))
+    
     phi = QBF(num_vars, num_clauses, "type2_size{}".format(n))
 
     generate_quantifier_blocks(phi, n)
-    generate_clauses(phi, n)
+    if encoding == 'counter':
+        generate_counter_clauses(phi, n)
+    else:
+        generate_clauses(phi, n)
 
     return phi
 
+def write_ChenType2(n, out):
+    """
+    Writes the exponential Type 2 Chen Formula for the value n in QDIMACS
+    directly onto a file object, without building a QBF object.
+    
+    NOTE: the clauses are produced lazily by iter_clauses and written through
+          the bounded buffer of write_QDIMACS; the number of clauses of the
+          header is computed analytically by count_clauses.
+    
+    -Input-: an integer n and a file object out opened for writing
+    -Precondition-: n ≥ 1
+    -Output-: -
+    -Postcondition-: out contains the same text as
+    generate_ChenType2(n).write_QDIMACS(out) would write.
+    -Cost-: Θ(4^n) time, Θ(n) memory
+    """
+    
+    write_QDIMACS(out, 2*n, count_clauses(n), iter_quantifier_blocks(n), iter_clauses(n))
+
 ###############################################################################
 ###############################################################################
 
@@ -63,11 +99,19 @@ def generate_quantifier_blocks(phi, n):
     -Cost-: Θ(n)
     """
     
-    i = 1
-    while i in range(1, 2*n + 1):
-        phi.add_quantifier_block('e', [i])
-        phi.add_quantifier_block('a', [i + 1])
-        i += 2
+    for B in iter_quantifier_blocks(n):
+        phi.add_quantifier_block(B[0], B[1])
+
+def iter_quantifier_blocks(n):
+    """
+    Yields the quantifier blocks ∃1 ∀2 ∃3 ∀4 ... ∃(2n - 1) ∀2n.
+    
+    -Cost-: Θ(n)
+    """
+    
+    for i in range(1, 2*n + 1, 2):
+        yield ['e', [i]]
+        yield ['a', [i + 1]]
         
 def generate_clauses(phi, n):
     """
@@ -81,11 +125,85 @@ def generate_clauses(phi, n):
     -Cost-: Θ(4^n)
     """
     
+    for C in iter_clauses(n):
+        phi.add_clause(C, isNew=True)
+
+def iter_clauses(n):
+    """
+    Yields the clauses of the formula one at a time, straight from the stream
+    of combinations of negated variables.
+    
+    -Input-: an integer n
+    -Precondition-: n ≥ 1
+    -Output-: a generator of clauses
+    -Postcondition-: the clauses are yielded in the same order in which
+    generate_clauses adds them.
+    -Cost-: Θ(4^n) time, Θ(n) memory
+    """
+    
+    variables = list(range(1, 2*n + 1))
     for i in range(0, 2*n + 1):
         if is_congruent(i, n, 3):
-            for comb in combinations(range(1, 2*n + 1), i):
-                new_clause = list(range(1, 2*n + 1))
-                for var in comb:
+            for negated in combinations(variables, i):
+                new_clause = variables.copy()
+                for var in negated:
                     new_clause[var - 1] = -var
-                phi.add_clause(new_clause, isNew=True)
-                
\ No newline at end of file
+                yield new_clause
+
+def count_clauses(n):
+    """
+    Returns the number of clauses of the formula, the sum of the binomial
+    coefficients (2n choose i) for every i ≡ n (mod 3).
+    
+    -Cost-: Θ(n)
+    """
+    
+    return sum([comb(2*n, i) for i in range(0, 2*n + 1) if is_congruent(i, n, 3)])
+
+def counter_index(n, t, r):
+    """
+    Returns the index of the auxiliary variable c_t_r, which is true iff the
+    number of true variables among 1, ..., t is congruent with r mod 3.
+    
+    -Input-: integers n, t and r
+    -Precondition-: 0 ≤ t ≤ 2n, 0 ≤ r ≤ 2
+    -Output-: a natural number
+    -Postcondition-: the output is 2n + 3t + r + 1
+    -Cost-: Θ(1)
+    """
+    
+    return 2*n + 3*t + r + 1
+
+def generate_counter_clauses(phi, n):
+    """
+    Generates the clauses of the counter encoding on the formula.
+    
+    -Input-: a QBF object phi and an integer n
+    -Precondition-: n ≥ 1
+    -Output-: -
+    -Postcondition-: the phi QBF object is updated with an innermost existential
+    block of auxiliary variables c_t_r and with clauses stating that c_0_0 holds,
+    that c_t_r ⟷ (t ? c_{t-1}_{r-1} : c_{t-1}_r) and that c_2n_{n mod 3} does
+    not hold; for every assignment of the variables 1, ..., 2n, the auxiliary
+    variables are forced, so the formula is equivalent to the exponential one.
+    -Cost-: Θ(n)
+    """
+    
+    c = lambda t, r: counter_index(n, t, r)
+    
+    phi.add_quantifier_block('e', list(range(c(0, 0), c(2*n, 2) + 1)))
+    
+    phi.add_clause([c(0, 0)])
+    phi.add_clause([-c(0, 1)])
+    phi.add_clause([-c(0, 2)])
+    
+    for t in range(1, 2*n + 1):
+        for r in [0, 1, 2]:
+            kept = c(t - 1, r) # count unchanged if t is false
+            moved = c(t - 1, (r - 1) % 3) # count incremented if t is true
+            phi.add_clause([-t, -moved, c(t, r)])
+            phi.add_clause([-t, moved, -c(t, r)])
+            phi.add_clause([t, -kept, c(t, r)])
+            phi.add_clause([t, kept, -c(t, r)])
+    
+    phi.add_clause([-c(2*n, n % 3)])
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Imports:
+from generators.batch_generator import FORMATS, generate_instance
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import time
+import os
+
+###############################################################################
+#========================== PARALLEL SUITE BUILDER ===========================#
+###############################################################################
+
+def build_suite(sizes, formats=tuple(FORMATS), output_dir="./final_formulas",
+                workers=None, verbose=True, cache=None, compression=""):
+    """
+    Generates the instances of every format for every size on a pool of
+    worker processes.
+
+    NOTE: the (format, n) jobs are submitted from the largest to the smallest
+          estimated output size and every idle worker takes the next pending
+          job, so the big instances start first and the small ones fill the
+          gaps at the end. Every instance is written atomically by
+          generate_instance.
+
+    -Input-: an iterable of sizes, an iterable of formats (keys of FORMATS),
+    the output directory, the number of worker processes (the number of CPUs
+    if None), whether to print a line per finished instance, an InstanceCache
+    to take the instances from (None to always generate them) and a
+    compression suffix for the files (see generate_batch)
+    -Precondition-: every size is ≥ 1
+    -Output-: a list of tuples (format, n, path, seconds, bytes), in order of
+    completion
+    -Postcondition-: every instance has been written inside output_dir.
+    -Cost-: Θ(total size of the instances / workers)
+    """
+
+    for form in formats:
+        if form not in FORMATS:
+            raise ValueError("unknown format '{}'".format(form))
+
+    jobs = [(form, n) for n in sizes for form in formats]
+    jobs.sort(key=lambda job: estimate_size(*job), reverse=True)
+
+    report = list()
+    t0 = time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(generate_instance, form, n, output_dir, cache,
+                               compression): (form, n)
+                   for form, n in jobs}
+        for future in as_completed(futures):
+            form, n = futures[future]
+            path, t = future.result()
+            size = os.path.getsize(path)
+            report.append((form, n, path, t, size))
+            if verbose:
+                print("[{} n = {}] {} bytes in {} s: {} bytes/s".format(
+                    form, n, size, t, size / t if t > 0 else float('inf')))
+
+    if verbose:
+        t = time() - t0
+        total = sum([entry[4] for entry in report])
+        print("Suite: {} instances, {} bytes in {} s: {} bytes/s".format(
+            len(report), total, t, total / t if t > 0 else float('inf')))
+    return report
+
+def estimate_size(form, n):
+    """
+    Estimates the size in bytes of an instance from the number of integers it
+    contains and the number of digits of the largest one.
+
+    -Cost-: Θ(1)
+    """
+
+    if form == 'T1-QDIMACS':
+        # 53 literals and 16 line terminators per i, on 9n + 4 variables
+        return n * (53 * (len(str(9*n + 4)) + 1) + 32)
+    elif form == 'T2-QDIMACS':
+        # 128 literals and 54 clauses per layer, on 19n - 12 variables
+        return n * (128 * (len(str(19*n)) + 1) + 108)
+    else:
+        # 54 identifiers and 17 gate lines per layer, on 19n - 12 identifiers
+        return n * (54 * (len(str(19*n)) + 2) + 17 * 10)
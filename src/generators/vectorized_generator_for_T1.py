@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Imports:
+import numpy as np
+
+CHUNK_SIZE = 8192 # number of rows formatted before each write
+
+###############################################################################
+#====================== VECTORIZED GENERATOR FOR TYPE 1 ======================#
+###############################################################################
+
+def generate_ChenType1_arrays(n):
+    """
+    Generates a Type 1 Chen Formula for the value n as NumPy arrays.
+
+    NOTE: the prefix is returned as an (n, 9) matrix whose i-th row holds the
+          variables of the blocks X'_i, y_i and X_i (the block for X_0 is always
+          [1, 2, 3, 4]); the matrix of the formula is returned as a (12n + 6, 4)
+          matrix with one clause per row, padded with zeros on the right.
+
+    -Input-: an integer n
+    -Precondition-: 1 ≤ n < 2^31 / 9
+    -Output-: a tuple (P, M) of int32 arrays
+    -Postcondition-: the rows of P and M are the quantifier blocks and the
+    clauses of the Chen Formula of Type 1 for size n, in the same order as
+    generate_ChenType1(n) produces them.
+    -Cost-: Θ(n)
+    """
+
+    i = np.arange(1, n + 1, dtype=np.int32)
+
+    # prefix: X'_i = 9i..9i+3, y_i = 9i+4, X_i = 9i-4..9i-1
+    P = np.empty((n, 9), dtype=np.int32)
+    P[:, 0:4] = 9*i[:, None] + np.arange(0, 4, dtype=np.int32)
+    P[:, 4] = 9*i + 4
+    P[:, 5:9] = 9*i[:, None] + np.arange(-4, 0, dtype=np.int32)
+
+    M = np.zeros((12*n + 6, 4), dtype=np.int32)
+
+    # B-clauses
+    M[0:4, 0] = -np.arange(1, 5, dtype=np.int32)
+    M[4:6, 0:2] = [[9*n - 4, 9*n - 3], [9*n - 2, 9*n - 1]]
+
+    # H-clauses, indexed by (i, j, k, l)
+    I = i[:, None, None, None]
+    J = np.arange(2, dtype=np.int32)[None, :, None, None]
+    K = np.arange(2, dtype=np.int32)[None, None, :, None]
+    L = np.arange(2, dtype=np.int32)[None, None, None, :]
+    x_prev = np.where(I == 1, 2*J + 1, 9*I - 13 + 2*J) # x_{i-1, j, 0}
+
+    H = M[6:8*n + 6].reshape(n, 2, 2, 2, 4)
+    H[..., 0] = -(9*I + K)
+    H[..., 1] = -(9*I + 2 + L)
+    H[..., 2] = x_prev
+    H[..., 3] = x_prev + 1
+
+    # T-clauses, indexed by (i, j, k)
+    I = i[:, None, None]
+    J = np.arange(2, dtype=np.int32)[None, :, None]
+    K = np.arange(2, dtype=np.int32)[None, None, :]
+
+    T = M[8*n + 6:].reshape(n, 2, 2, 4)
+    T[..., 0] = -(9*I - 4 + 2*J + K)
+    T[..., 1] = (9*I + 4) * (1 - 2*J)
+    T[..., 2] = 9*I + 2*J + K
+
+    return P, M
+
+def write_ChenType1_arrays(n, out, chunk_size=CHUNK_SIZE):
+    """
+    Writes a Type 1 Chen Formula for the value n in QDIMACS onto a file
+    object, generating it with generate_ChenType1_arrays.
+
+    -Input-: an integer n and a file object out opened for writing
+    -Precondition-: 1 ≤ n < 2^31 / 9
+    -Output-: -
+    -Postcondition-: out contains the same text as the one written by
+    generate_ChenType1(n).write_QDIMACS(out).
+    -Cost-: Θ(n)
+    """
+
+    P, M = generate_ChenType1_arrays(n)
+
+    out.write("p cnf {} {}\n".format(9*n + 4, 12*n + 6))
+    out.write("e 1 2 3 4 0\n")
+    write_rows(out, P, "e %d %d %d %d 0\na %d 0\ne %d %d %d %d 0\n", chunk_size)
+    write_clause_matrix(out, M, chunk_size)
+
+###############################################################################
+###############################################################################
+
+# ========================= Vectorized serialization ========================= #
+
+def write_rows(out, A, row_format, chunk_size=CHUNK_SIZE):
+    """
+    Writes every row of a 2D integer array onto out using the same format.
+
+    -Input-: a file object out, an array A and a %-format string row_format
+    with as many fields as A has columns
+    -Precondition-: chunk_size ≥ 1
+    -Output-: -
+    -Postcondition-: row_format % tuple(row) has been written for every row of
+    A, formatting chunk_size rows with a single formatting operation.
+    -Cost-: Θ(size of A)
+    """
+
+    for start in range(0, len(A), chunk_size):
+        chunk = A[start:start + chunk_size]
+        out.write(row_format * len(chunk) % tuple(chunk.ravel().tolist()))
+
+def write_clause_matrix(out, M, chunk_size=CHUNK_SIZE):
+    """
+    Writes the clauses of a zero-padded clause matrix in QDIMACS.
+
+    -Input-: a file object out and a 2D integer array M with one clause per
+    row, padded with zeros on the right
+    -Precondition-: chunk_size ≥ 1
+    -Output-: -
+    -Postcondition-: every row of M has been written as a QDIMACS clause line;
+    consecutive rows of equal width are formatted together by write_rows.
+    -Cost-: Θ(size of M)
+    """
+
+    widths = np.count_nonzero(M, axis=1)
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(widths)) + 1, [len(M)]))
+
+    for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        w = int(widths[start])
+        write_rows(out, M[start:end, :w], "%d " * w + "0\n", chunk_size)
@@ -2,10 +2,128 @@
 # -*- coding: utf-8 -*-
 
 # Imports:
-from tools.system_tools import run_command
-from time import time
+from tools.system_tools import run_solver, reads_stdin, open_output, SolverResult
+from tools.result_cache import hash_file, hash_instance, hash_solver
+from instance_encodings.QBF import QBF, CHUNK_SIZE, write_clauses
+from external_tools.qcir_to_qdimacs import convert_int_circuit
+from array import array
+from itertools import islice
+import io
+import shlex
 import os
 
+# Operation codes for the integer gate table:
+AND = 0
+OR = 1
+OP_NAMES = ['and', 'or']
+OP_CODES = {'and': AND, 'or': OR}
+
+###############################################################################
+#================================ QCIR writing ===============================#
+###############################################################################
+
+def write_QCIR(out, name, n_vars, n_gates, prefix, output_gate, gates, chunk_size=CHUNK_SIZE):
+    """
+    Writes a circuit with integer identifiers in QCIR onto a file object.
+    
+    -Input-: a file object out, the name of the circuit, its number of
+    variables and gates, an iterable prefix of quantifier blocks [Q, X], the
+    output literal and an iterable of gates (c, op, X) with op AND or OR and X
+    a list of signed integer literals
+    -Precondition-: chunk_size ≥ 1
+    -Output-: -
+    -Postcondition-: out contains the circuit in QCIR; the gate lines are
+    formatted in chunks of at most chunk_size lines.
+    -Cost-: Θ(size of the circuit)
+    """
+    
+    # preamble
+    out.write("#QCIR-G14\n")
+    out.write("# Circuit name: {}\n".format(name))
+    out.write("# Num. vars.: {}\n".format(n_vars))
+    out.write("# Num. gates: {}\n".format(n_gates))
+    
+    # quantifiers
+    for B in prefix:
+        Q = "exists" if B[0] == 'e' else "forall"
+        out.write("{}({})\n".format(Q, ", ".join(map(str, B[1]))))
+    
+    # output
+    out.write("output({})\n".format(output_gate))
+    
+    # gates
+    gates = iter(gates)
+    while True:
+        chunk = "".join(["{} = {}({})\n".format(c, OP_NAMES[op], ", ".join(map(str, X)))
+                         for c, op, X in islice(gates, chunk_size)])
+        if not chunk:
+            break
+        out.write(chunk)
+
+###############################################################################
+#=========================== Tseitin transformation ==========================#
+###############################################################################
+
+def iter_Tseitin_clauses(gates, output_gate):
+    """
+    Yields the clauses of the Tseitin transformation of a circuit.
+    
+    -Input-: an iterable of gates (c, op, X), where c is the variable of the
+    gate, op is AND or OR and X is a list of signed integer literals, and the
+    literal of the output gate
+    -Precondition-: -
+    -Output-: a generator of clauses (lists of integers)
+    -Postcondition-: the clauses yielded define every gate variable c as the
+    conjunction or disjunction of its inputs (len(X) + 1 clauses per gate) and,
+    at the end, assert the output gate.
+    -Cost-: Θ(size of the circuit)
+    """
+    
+    for c, op, X in gates:
+        if op == OR:
+            yield X + [-c]
+            for x in X:
+                yield [-x, c]
+        else:
+            yield [-x for x in X] + [c]
+            for x in X:
+                yield [x, -c]
+    
+    yield [output_gate]
+
+def write_Tseitin_QDIMACS(out, n_vars, n_gates, n_inputs, prefix, gates, output_gate,
+                          chunk_size=CHUNK_SIZE):
+    """
+    Writes the Tseitin transformation of a circuit in QDIMACS onto a file
+    object, walking the gates only once and without building a QBF object.
+    
+    -Input-: a file object out, the number of variables n_vars, the number of
+    gates n_gates, the total number of gate inputs n_inputs, an iterable prefix
+    of quantifier blocks [Q, X] over the variables, an iterable of gates
+    (c, op, X) as in iter_Tseitin_clauses and the literal of the output gate
+    -Precondition-: the variables are 1, ..., n_vars and the gate variables
+    are n_vars + 1, ..., n_vars + n_gates
+    -Output-: -
+    -Postcondition-: out contains the prefix followed by an existential block
+    with the gate variables and the clauses of iter_Tseitin_clauses; the header
+    is computed up front, since every gate yields len(X) + 1 clauses.
+    -Cost-: Θ(size of the circuit) time, Θ(chunk_size) memory beyond the prefix
+    """
+    
+    out.write("p cnf {} {}\n".format(n_vars + n_gates, n_inputs + n_gates + 1))
+    
+    for B in prefix:
+        out.write(" ".join([B[0]] + [str(var) for var in B[1]] + ["0\n"]))
+    
+    # existential block of the gate variables, written in chunks
+    out.write("e")
+    for start in range(n_vars + 1, n_vars + n_gates + 1, chunk_size):
+        end = min(start + chunk_size, n_vars + n_gates + 1)
+        out.write(" " + " ".join(map(str, range(start, end))))
+    out.write(" 0\n")
+    
+    write_clauses(out, iter_Tseitin_clauses(gates, output_gate), chunk_size)
+
 ###############################################################################
 #================================= QBC Class =================================#
 ###############################################################################
@@ -33,6 +151,19 @@ class QBC:
         variable to gneerate new id's
     id_to_indext : dict
         dictionary to map identifiers to indices
+    int_gates : bool
+        if True, variables and gates are identified by positive integers,
+        literals are signed integers and the gates are stored in the integer
+        gate table below instead of in gates
+    gate_ids : array('i')
+        identifier of each gate of the integer gate table
+    gate_ops : array('b')
+        operation code (AND or OR) of each gate of the integer gate table
+    gate_offsets : array('q')
+        the inputs of the k-th gate are gate_inputs[gate_offsets[k]:gate_offsets[k+1]]
+    gate_inputs : array('i')
+        signed integer literals of the inputs of all the gates, one gate
+        after the other
         
     Methods (WRONG COMMENTS - TO BE CHANGED)
     -------
@@ -76,20 +207,47 @@ class QBC:
     convert(to='QDIMACS')
         Converts the formula to a string in some standard format, such as
         QDIMACS or QCIR (only QDIMACS supported at the moment).
+    
+    convert_to_QDIMACS(store='list')
+        Converts the circuit to an equivalent QBF object in prenex CNF.
+    
+    write_QDIMACS(out, chunk_size=CHUNK_SIZE)
+        Writes the CNF of convert_to_QDIMACS directly onto the file object out,
+        without building the intermediate QBF object.
+    
+    write_QCIR(out, chunk_size=CHUNK_SIZE)
+        Writes the circuit in QCIR onto the file object out in chunks.
+    
+    write_simplified_QDIMACS(out, max_nodes=None)
+        Writes the circuit in QDIMACS as the external converter
+        qcir_to_qdimacs.py does (simplified, gates numbered by nesting level),
+        handing it the integer gate table instead of QCIR text.
+    
+    add_int_gate(identifier, op, X, isNew=False)
+        Adds a gate to the integer gate table; op is AND or OR and X is a list
+        of signed integer literals.
+    
+    get_n_defined_gates()
+        Returns the number of gates actually defined in the circuit.
         
-    print_formula(mode='default', output='stdIO', filename=None)
-        Prints the formula in the specified mode (normal for 'default' or QDIMACS
-        or QCIR otherwise), either in the standard output or onto a text file.
+    print_formula(output='stdIO', filename=None, form='QCIR')
+        Prints the circuit in QCIR or its Tseitin transformation in QDIMACS,
+        either in the standard output or onto a text file.
         
-    check_satisfiability(self, solver='depqbf', time=True)
+    check_satisfiability(solver='depqbf', time_limit=None, memory_limit=None, pipe=None, cache=None, force=False)
         Checks the satisfiability of the formula on a specified QBF solver
-        (depqbf if not specified otherwise). Returns on a string the output
-        of the solver and the time required to check the satisfiability in seconds.
+        (depqbf if not specified otherwise), killing it if it exceeds the time
+        or memory limits. The formula is streamed onto the stdin of the solver
+        when it supports it and written onto a file otherwise. If a ResultCache
+        is given, a result stored for the same formula, solver and limits is
+        returned without running the solver (unless force is True). Returns a
+        SolverResult with the answer, the exit code, the CPU time, the peak
+        memory and whether the solver timed out.
         This function does not yet run on Windows.
         
     """
 
-    def __init__(self, n, m, output_gate=None, name=""):
+    def __init__(self, n, m, output_gate=None, name="", int_gates=False):
         self.n = n # number of variables
         self.m = m # number of gates
         self.output_gate = output_gate
@@ -98,6 +256,13 @@ class QBC:
         self.name = name # name
         self.id_counter = 0
         self.id_to_index = {}
+        
+        # integer gate table
+        self.int_gates = int_gates
+        self.gate_ids = array('i')
+        self.gate_ops = array('b')
+        self.gate_offsets = array('q', [0])
+        self.gate_inputs = array('i')
 
     def get_n_vars(self):
         return self.n
@@ -115,7 +280,18 @@ class QBC:
         return self.prefix
 
     def get_gates(self):
-        return self.gates
+        if not self.int_gates:
+            return self.gates
+        
+        # build the tuples of the string representation from the gate table
+        gates = list()
+        for k in range(len(self.gate_ids)):
+            X = self.gate_inputs[self.gate_offsets[k]:self.gate_offsets[k + 1]]
+            gates.append((str(self.gate_ids[k]), OP_NAMES[self.gate_ops[k]], [str(x) for x in X]))
+        return gates
+    
+    def get_n_defined_gates(self):
+        return len(self.gate_ids) if self.int_gates else len(self.gates)
 
     def set_prefix(self, P):
         self.prefix = P
@@ -142,6 +318,15 @@ class QBC:
         if isNew:
             self.m += 1
             
+    def add_int_gate(self, identifier, op, X, isNew=False):
+        self.gate_ids.append(identifier)
+        self.gate_ops.append(op)
+        self.gate_inputs.extend(X)
+        self.gate_offsets.append(len(self.gate_inputs))
+        
+        if isNew:
+            self.m += 1
+            
     def obtain_new_id(self):
         id_counter += 1
         new_id = 'g' + str(id_counter)
@@ -166,6 +351,10 @@ class QBC:
         """
         
         phi = self
+        
+        if phi.int_gates:
+            return phi.convert_int_gates()
+        
         converted = ""
         
         # preamble
@@ -214,10 +403,258 @@ class QBC:
             converted += gate + "\n"
         return converted
 
-    def print_formula(self, output='stdIO', filename=None):
+    def convert_int_gates(self):
+        """
+        Converts a circuit stored in the integer gate table to a string
+        encoding in QCIR; integers are only formatted as text here.
+        
+        """
+        
+        converted = io.StringIO()
+        self.write_QCIR(converted)
+        return converted.getvalue()
+    
+    def write_QCIR(self, out, chunk_size=CHUNK_SIZE):
+        """
+        Writes the circuit in QCIR onto the file object out, formatting the
+        gates of the integer gate table in chunks of chunk_size lines.
+        
+        """
+        
+        phi = self
+        if not phi.int_gates:
+            out.write(phi.convert())
+            return
+        
+        ids, ops, offsets, inputs = phi.gate_ids, phi.gate_ops, phi.gate_offsets, phi.gate_inputs
+        gates = ((ids[k], ops[k], inputs[offsets[k]:offsets[k + 1]]) for k in range(len(ids)))
+        write_QCIR(out, phi.get_name(), phi.get_n_vars(), phi.get_n_gates(),
+                   phi.get_prefix(), phi.get_output_gate(), gates, chunk_size)
+    
+    def convert_to_QDIMACS(self, store='list'):
+        """
+        Converts the circuit to a QBF object in prenex CNF by means of the
+        Tseitin transformation; store selects the clause store of the QBF
+        object ('list' or 'array').
+        
+        """
+        
+        C = self
+        
+        if C.int_gates:
+            return C.convert_int_gates_to_QDIMACS(store)
+        
+        phi = QBF(C.get_n_gates() + C.get_n_vars() - 1, 0, name=C.get_name() + "_CNF", store=store)
+        
+        # add basic quantifier blocks
+        dic = {}
+        counter = 0
+        for B in C.get_prefix():
+            Q = C.get_quantifier_from_block(B)
+            V = C.get_variables_from_block(B)
+            X = []
+            for v in V:
+                counter += 1
+                dic[v] = counter
+                X.append(counter)
+            phi.add_quantifier_block(Q, X)
+            
+        aux_vars = list()
+        
+        for G in C.get_gates():
+            gate_id = G[0]
+            op = G[1]
+            V = G[2]
+            
+            counter += 1
+            dic[gate_id] = counter
+            aux_vars.append(counter)
+            
+            c = counter
+            
+            x = dic[V[0]] if V[0][0] != '-' else -1 * dic[V[0][1:]]
+            y = dic[V[1]] if V[1][0] != '-' else -1 * dic[V[1][1:]]
+            z = 0
+            
+            if len(V) == 3:
+                z = dic[V[2]] if V[2][0] != '-' else -1 * dic[V[2][1:]]
+
+            if op == "or" and len(V) == 3:
+                phi.add_clause([x, y, z, -c], True)
+                phi.add_clause([-x, c], True)
+                phi.add_clause([-y, c], True)
+                phi.add_clause([-z, c], True)
+                
+            elif op == "or":
+                phi.add_clause([x, y, -c], True)
+                phi.add_clause([-x, c], True)
+                phi.add_clause([-y, c], True)
+                
+            elif op == "and":
+                phi.add_clause([-x, -y, c], True)
+                phi.add_clause([x, -c], True)
+                phi.add_clause([y, -c], True)
+        
+        phi.add_quantifier_block('e', aux_vars)
+        phi.n = counter # variables actually introduced by the transformation
+        
+        g = C.get_output_gate()
+        op = ''
+        if g[0] == '-':
+            op = "-"
+            g = dic[g[1:]]
+        else:
+            g = dic[g]
+        
+        phi.add_clause([int(op + str(g))], True)
+        
+        return phi
+
+    def renumber_int_gates(self):
+        """
+        Renumbers the variables and gates of the integer gate table in order of
+        appearance (first the prefix, then the gates in definition order), as
+        the Tseitin transformation does.
+        
+        Returns the renumbered prefix and a generator of the renumbered gates
+        (c, op, X); the new numbers are kept in an array indexed by the integer
+        identifiers instead of a dictionary.
+        
+        """
+        
+        C = self
+        ids, ops, offsets, inputs = C.gate_ids, C.gate_ops, C.gate_offsets, C.gate_inputs
+        
+        max_id = max(ids) if len(ids) > 0 else 0
+        for B in C.get_prefix():
+            max_id = max([max_id] + list(C.get_variables_from_block(B)))
+        index = array('i', bytes(4 * (max_id + 1))) # new number of each id
+        
+        prefix = list()
+        counter = 0
+        for B in C.get_prefix():
+            X = []
+            for v in C.get_variables_from_block(B):
+                counter += 1
+                index[v] = counter
+                X.append(counter)
+            prefix.append([C.get_quantifier_from_block(B), X])
+        
+        # gates must be numbered before they are used as inputs
+        for k in range(len(ids)):
+            index[ids[k]] = counter + k + 1
+        
+        def gates():
+            for k in range(len(ids)):
+                X = [index[x] if x > 0 else -index[-x] for x in inputs[offsets[k]:offsets[k + 1]]]
+                yield counter + k + 1, ops[k], X
+        
+        g = C.get_output_gate()
+        output_gate = index[g] if g > 0 else -index[-g]
+        
+        return prefix, gates(), output_gate
+    
+    def convert_int_gates_to_QDIMACS(self, store='list'):
+        """
+        Tseitin transformation of a circuit stored in the integer gate table.
+        
+        Variables and gates are renumbered exactly as in convert_to_QDIMACS.
+        
+        """
+        
+        C = self
+        prefix, gates, output_gate = C.renumber_int_gates()
+        n_vars = sum([len(C.get_variables_from_block(B)) for B in prefix])
+        n_gates = len(C.gate_ids)
+        
+        phi = QBF(n_vars + n_gates, 0, name=C.get_name() + "_CNF", store=store)
+        for B in prefix:
+            phi.add_quantifier_block(C.get_quantifier_from_block(B), C.get_variables_from_block(B))
+        phi.add_quantifier_block('e', list(range(n_vars + 1, n_vars + n_gates + 1)))
+        
+        for clause in iter_Tseitin_clauses(gates, output_gate):
+            phi.add_clause(clause, True)
+        
+        return phi
+    
+    def write_QDIMACS(self, out, chunk_size=CHUNK_SIZE):
+        """
+        Writes the Tseitin transformation of the circuit in QDIMACS onto the
+        file object out, walking the gates once and writing the clauses as they
+        are produced, without building the intermediate QBF object.
+        
+        """
+        
+        C = self
+        if not C.int_gates:
+            C.convert_to_QDIMACS().write_QDIMACS(out, chunk_size)
+            return
+        
+        prefix, gates, output_gate = C.renumber_int_gates()
+        n_vars = sum([len(C.get_variables_from_block(B)) for B in prefix])
+        write_Tseitin_QDIMACS(out, n_vars, len(C.gate_ids), len(C.gate_inputs),
+                              prefix, gates, output_gate, chunk_size)
+    
+    def write_simplified_QDIMACS(self, out, max_nodes=None):
+        """
+        Writes the circuit in QDIMACS onto out as the external converter
+        qcir_to_qdimacs.py converts its QCIR file: the circuit is simplified
+        and its gates are numbered by nesting level before the Tseitin
+        transformation. The gate table is handed to the converter directly,
+        without writing and parsing the QCIR text.
+        
+        -Input-: a path or a seekable file object out (closed at the end) and
+        the maximum number of formula nodes of the conversion (no limit if
+        None)
+        -Precondition-: the circuit is stored in the integer gate table
+        -Output-: -
+        -Postcondition-: out contains the same text as the output of
+        qcir_to_qdimacs.py on the QCIR file of the circuit.
+        -Cost-: Θ(size of the circuit)
+        """
+        
+        C = self
+        if not C.int_gates:
+            raise ValueError("the circuit must be stored in the integer gate table")
+        
+        ids, ops, offsets, inputs = C.gate_ids, C.gate_ops, C.gate_offsets, C.gate_inputs
+        quantifiers = {'e': 'exists', 'a': 'forall'}
+        prefix = [(quantifiers[C.get_quantifier_from_block(B)], C.get_variables_from_block(B))
+                  for B in C.get_prefix()]
+        gates = ((ids[k], OP_NAMES[ops[k]], inputs[offsets[k]:offsets[k + 1]]) for k in range(len(ids)))
+        convert_int_circuit(prefix, gates, C.get_output_gate(), out, max_nodes=max_nodes)
+
+    def print_formula(self, output='stdIO', filename=None, form='QCIR'):
+        """
+        Prints the circuit in QCIR or, if form is 'QDIMACS', its Tseitin
+        transformation in QDIMACS, either in the standard output or onto a text
+        file in the ./output_files folder. Files are written with write_QCIR
+        or write_QDIMACS, without building the whole text in memory, and are
+        compressed on the fly if filename ends with '.gz', '.bz2', '.xz' or
+        '.zst' (see open_output).
+        
+        """
+        
+        if form in ('QCIR', 'QDIMACS') and output == "file":
+            if filename == None: # default filename
+                filename = self.name + (".qcir" if form == 'QCIR' else ".qdimacs")
+            filename = "./output_files/" + filename
+            file = open_output(filename)
+            if form == 'QCIR':
+                self.write_QCIR(file)
+            else:
+                self.write_QDIMACS(file)
+            file.close()
+            return
         
         result = ""
-        result = self.convert()
+        if form == 'QCIR':
+            result = self.convert()
+        elif form == 'QDIMACS':
+            result = self.convert_to_QDIMACS().convert()
+        else:
+            print("ERROR: Format not recognised.")
+            return
         
         # Output the formula:
         if output == "stdIO":
@@ -229,22 +666,13 @@ class QBC:
                 return
             else:
                 print(result)
-                
-        elif output == "file":
-            if filename == None: # default filename
-                ext = ".qcir"
-                filename = self.name + ext
-                
-            filename = "./output_files/" + filename
-            file = open(filename, 'w')
-            file.write(result)
-            file.close()
             
         else:
             print("ERROR: Incorrect output selection.")
             return
 
-    def check_satisfiability(self, solver='depqbf', checkTime=True):
+    def check_satisfiability(self, solver='depqbf', time_limit=None, memory_limit=None, pipe=None,
+                             cache=None, force=False):
         """
         Checks the satisfiability of the formula on a given solver.
         
@@ -252,26 +680,58 @@ class QBC:
         
         -Parameters-:
             - solver: -- 'depqbf' for DepQBF
-                      -- [other solvers are not yet supported]
-            - checkTime: if True, it will return both the time consumed by the
-                        solver as well as the output of the solver.
-                        If False, it will just output the result of the
-                        solver (times in seconds).
+                      -- any other solver command reading QDIMACS files
+            - time_limit: maximum CPU time and wall time of the solver in
+                        seconds (None for no limit). When it is exceeded, the
+                        whole process group of the solver is killed.
+            - memory_limit: maximum address space of the solver in bytes
+                        (None for no limit).
+            - pipe: -- True to stream the QDIMACS onto the stdin of the solver
+                       while it is generated
+                    -- False to write it onto a file under ./output_files/
+                       and give the path to the solver
+                    -- None to pipe only for the solvers in STDIN_SOLVERS
+            - cache: a tools.result_cache.ResultCache, or None not to cache
+                     results. The key is the SHA-256 of the QDIMACS text, the
+                     hash of the solver and the limits (the wall time limit
+                     being time_limit). When piping, the text is generated
+                     once to be hashed and once more for the solver, so
+                     caching doubles the generation cost on a cache miss;
+                     otherwise the file is hashed once written.
+            - force: if True, the solver is run even if the result is cached
+                     (and the cached result is replaced).
+        
+        -Output-: a SolverResult (status, exit_code, cpu_time, peak_rss,
+        wall_time, timed_out, output), see tools.system_tools.run_solver
         
         """
         
         if os.name == 'nt':
             print("Running on Windows: cannot check satifiability.")
-            return "", 0.0
+            return SolverResult('UNKNOWN', None, 0.0, 0, 0.0, False, "")
+        
+        command = shlex.split(solver)
+        if pipe is None:
+            pipe = reads_stdin(command)
         
-        name = 'checking' + self.name + '.qdimacs'
-        name = self.print_formula(mode='QDIMACS', output='file', filename=name)
+        if not pipe:
+            name = 'checking' + self.name + '.qdimacs'
+            self.print_formula(output='file', filename=name, form='QDIMACS')
+            path = "./output_files/" + name
         
-        if checkTime == True:
-            t0 = time()
-            res = run_command(solver + " " + name)
-            t = time() - t0
-            return res, t
+        limits = time_limit, memory_limit, time_limit # CPU, memory and wall time
+        if cache is not None:
+            instance = hash_instance(self.write_QDIMACS) if pipe else hash_file(path).hexdigest()
+            key = instance, hash_solver(command)
+            res = None if force else cache.lookup(*key, *limits)
+            if res is not None:
+                return res
+        
+        if pipe:
+            res = run_solver(command, *limits, write_input=self.write_QDIMACS)
         else:
-            res = run_command(solver + " " + name)
-            return res
\ No newline at end of file
+            res = run_solver(command + [path], *limits)
+        
+        if cache is not None:
+            cache.store(*key, res, *limits)
+        return res
\ No newline at end of file
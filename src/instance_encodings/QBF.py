@@ -2,10 +2,67 @@
 # -*- coding: utf-8 -*-
 
 # Imports:
-from tools.system_tools import run_command
-from time import time
+from tools.system_tools import run_solver, reads_stdin, open_output, SolverResult
+from tools.result_cache import hash_file, hash_instance, hash_solver
+from instance_encodings.clause_store import ClauseStore
+from itertools import islice
+import shlex
 import os
 
+CHUNK_SIZE = 8192 # number of lines buffered before each write
+
+###############################################################################
+#============================== QDIMACS writing ==============================#
+###############################################################################
+
+def write_QDIMACS(out, n, m, prefix, clauses, chunk_size=CHUNK_SIZE):
+    """
+    Writes a formula in the QDIMACS format directly onto a file object.
+    
+    -Input-: a file object out opened for writing in text mode, the number of
+    variables n, the number of clauses m, an iterable prefix of quantifier
+    blocks [Q, X] and an iterable of clauses (lists of integers)
+    -Precondition-: chunk_size ≥ 1
+    -Output-: -
+    -Postcondition-: the header, the prefix lines and the clauses have been
+    written onto out in chunks of at most chunk_size lines, so that the text of
+    the whole formula is never held in memory at once.
+    -Cost-: Θ(size of the formula)
+    """
+    
+    out.write("p cnf {} {}\n".format(n, m))
+
+    blocks = iter(prefix)
+    while True:
+        chunk = "".join([" ".join([B[0]] + [str(var) for var in B[1]] + ["0\n"])
+                         for B in islice(blocks, chunk_size)])
+        if not chunk:
+            break
+        out.write(chunk)
+
+    write_clauses(out, clauses, chunk_size)
+
+def write_clauses(out, clauses, chunk_size=CHUNK_SIZE):
+    """
+    Writes clauses as QDIMACS clause lines onto a file object.
+    
+    -Input-: a file object out opened for writing in text mode and an iterable
+    of clauses (iterables of integers)
+    -Precondition-: chunk_size ≥ 1
+    -Output-: -
+    -Postcondition-: every clause has been written onto out as a line ending
+    in 0, in chunks of at most chunk_size lines.
+    -Cost-: Θ(size of the clauses)
+    """
+    
+    clauses = iter(clauses)
+    while True:
+        chunk = "".join([" ".join(map(str, C)) + " 0\n"
+                         for C in islice(clauses, chunk_size)])
+        if not chunk:
+            break
+        out.write(chunk)
+
 ###############################################################################
 #================================= QBF Class =================================#
 ###############################################################################
@@ -25,9 +82,11 @@ class QBF:
         list of tuples representing the quantifier blocks; for instance, the
         quantifier block ƎxƎy is represented with ('e', [1, 2]) provided that
         1 and 2 are the integers representing x and y
-    clauses : list
+    clauses : list or ClauseStore
         list of lists containing the clauses; a clause like [1, 2, 4] represents
-        the disjunction of those three variables
+        the disjunction of those three variables; if the formula is created
+        with store='array', a ClauseStore with the same interface is used
+        instead, which takes a fraction of the memory
     name : string
         name of the formula for identification purposes
 
@@ -73,25 +132,42 @@ class QBF:
     convert(to='QDIMACS')
         Converts the formula to a string in some standard format, such as
         QDIMACS or QCIR (only QDIMACS supported at the moment).
+    
+    write_QDIMACS(out, chunk_size=CHUNK_SIZE)
+        Writes the formula in QDIMACS directly onto the file object out,
+        without building the whole text in memory.
         
-    print_formula(mode='default', output='stdIO', filename=None)
+    print_formula(mode='default', output='stdIO', filename=None, stream=True)
         Prints the formula in the specified mode (normal for 'default' or QDIMACS
         or QCIR otherwise), either in the standard output or onto a text file.
+        QDIMACS files are streamed with write_QDIMACS unless stream is False.
         
-    check_satisfiability(self, solver='depqbf', time=True)
+    check_satisfiability(solver='depqbf', time_limit=None, memory_limit=None, pipe=None, cache=None, force=False)
         Checks the satisfiability of the formula on a specified QBF solver
-        (depqbf if not specified otherwise). Returns on a string the output
-        of the solver and the time required to check the satisfiability in seconds.
+        (depqbf if not specified otherwise), killing it if it exceeds the time
+        or memory limits. The formula is streamed onto the stdin of the solver
+        when it supports it and written onto a file otherwise. If a ResultCache
+        is given, a result stored for the same formula, solver and limits is
+        returned without running the solver (unless force is True). Returns a
+        SolverResult with the answer, the exit code, the CPU time, the peak
+        memory and whether the solver timed out.
         This function does not yet run on Windows.
         
     """
 
-    def __init__(self, n, m, name=""):
+    def __init__(self, n, m, name="", store='list'):
         self.n = n # number of variables
         self.m = m # number of clauses
         self.prefix = list() # quantifier vector
-        self.clauses = list() # formula matrix
         self.name = name # name
+        
+        # formula matrix
+        if store == 'list':
+            self.clauses = list()
+        elif store == 'array':
+            self.clauses = ClauseStore()
+        else:
+            raise ValueError("unknown clause store '{}'".format(store))
 
     def get_n_vars(self):
         return self.n
@@ -115,6 +191,8 @@ class QBF:
         self.prefix = P
 
     def set_clauses(self, phi):
+        if isinstance(self.clauses, ClauseStore) and not isinstance(phi, ClauseStore):
+            phi = ClauseStore(phi)
         self.clauses = phi
 
     def add_clause(self, C, isNew=False):
@@ -166,7 +244,19 @@ class QBF:
 
         return converted
 
-    def print_formula(self, mode='default', output='stdIO', filename=None):
+    def write_QDIMACS(self, out, chunk_size=CHUNK_SIZE):
+        """
+        Writes the formula in the QDIMACS format onto the file object out.
+        
+        Unlike convert(), the text is emitted in buffered chunks of at most
+        chunk_size lines, so memory stays constant beyond the clauses themselves.
+        
+        """
+        
+        write_QDIMACS(out, self.get_n_vars(), self.get_n_clauses(),
+                      self.get_prefix(), self.get_clauses(), chunk_size)
+
+    def print_formula(self, mode='default', output='stdIO', filename=None, stream=True):
         """
         Prints the formula in the desired format.
         
@@ -181,10 +271,23 @@ class QBF:
                         include the desired extension. By default, all files
                         are saved onto the ./output_files folder. If a name is not
                         specified, the name will be formed using the name of the
-                        formula.
+                        formula. A further '.gz', '.bz2', '.xz' or '.zst' suffix
+                        compresses the file as it is written (see open_output).
+            - stream: if True, QDIMACS files are written in chunks with
+                      write_QDIMACS instead of being converted to a single
+                      string first.
         
         """
         
+        if stream and mode == 'QDIMACS' and output == "file":
+            if filename == None: # default filename
+                filename = self.name + ".qdimacs"
+            filename = "./output_files/" + filename
+            file = open_output(filename)
+            self.write_QDIMACS(file)
+            file.close()
+            return
+        
         result = ""
         
         # Convert the formula to a string.
@@ -246,7 +349,7 @@ class QBF:
                 filename = self.name + ext
                 
             filename = "./output_files/" + filename
-            file = open(filename, 'w')
+            file = open_output(filename)
             file.write(result)
             file.close()
             
@@ -254,7 +357,8 @@ class QBF:
             print("ERROR: Incorrect output selection.")
             return
 
-    def check_satisfiability(self, solver='depqbf', checkTime=True):
+    def check_satisfiability(self, solver='depqbf', time_limit=None, memory_limit=None, pipe=None,
+                             cache=None, force=False):
         """
         Checks the satisfiability of the formula on a given solver.
         
@@ -262,26 +366,58 @@ class QBF:
         
         -Parameters-:
             - solver: -- 'depqbf' for DepQBF
-                      -- [other solvers are not yet supported]
-            - checkTime: if True, it will return both the time consumed by the
-                        solver as well as the output of the solver.
-                        If False, it will just output the result of the
-                        solver (times in seconds).
+                      -- any other solver command reading QDIMACS files
+            - time_limit: maximum CPU time and wall time of the solver in
+                        seconds (None for no limit). When it is exceeded, the
+                        whole process group of the solver is killed.
+            - memory_limit: maximum address space of the solver in bytes
+                        (None for no limit).
+            - pipe: -- True to stream the QDIMACS onto the stdin of the solver
+                       while it is generated
+                    -- False to write it onto a file under ./output_files/
+                       and give the path to the solver
+                    -- None to pipe only for the solvers in STDIN_SOLVERS
+            - cache: a tools.result_cache.ResultCache, or None not to cache
+                     results. The key is the SHA-256 of the QDIMACS text, the
+                     hash of the solver and the limits (the wall time limit
+                     being time_limit). When piping, the text is generated
+                     once to be hashed and once more for the solver, so
+                     caching doubles the generation cost on a cache miss;
+                     otherwise the file is hashed once written.
+            - force: if True, the solver is run even if the result is cached
+                     (and the cached result is replaced).
+        
+        -Output-: a SolverResult (status, exit_code, cpu_time, peak_rss,
+        wall_time, timed_out, output), see tools.system_tools.run_solver
         
         """
         
         if os.name == 'nt':
             print("Running on Windows: cannot check satifiability.")
-            return "", 0.0
+            return SolverResult('UNKNOWN', None, 0.0, 0, 0.0, False, "")
+        
+        command = shlex.split(solver)
+        if pipe is None:
+            pipe = reads_stdin(command)
         
-        name = 'checking' + self.name + '.qdimacs'
-        name = self.print_formula(mode='QDIMACS', output='file', filename=name)
+        if not pipe:
+            name = 'checking' + self.name + '.qdimacs'
+            self.print_formula(mode='QDIMACS', output='file', filename=name)
+            path = "./output_files/" + name
         
-        if checkTime == True:
-            t0 = time()
-            res = run_command(solver + " " + name)
-            t = time() - t0
-            return res, t
+        limits = time_limit, memory_limit, time_limit # CPU, memory and wall time
+        if cache is not None:
+            instance = hash_instance(self.write_QDIMACS) if pipe else hash_file(path).hexdigest()
+            key = instance, hash_solver(command)
+            res = None if force else cache.lookup(*key, *limits)
+            if res is not None:
+                return res
+        
+        if pipe:
+            res = run_solver(command, *limits, write_input=self.write_QDIMACS)
         else:
-            res = run_command(solver + " " + name)
-            return res
\ No newline at end of file
+            res = run_solver(command + [path], *limits)
+        
+        if cache is not None:
+            cache.store(*key, res, *limits)
+        return res
\ No newline at end of file
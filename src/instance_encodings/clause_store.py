@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Imports:
+from array import array
+
+###############################################################################
+#============================= ClauseStore Class =============================#
+###############################################################################
+
+class ClauseStore:
+    """
+    A compact container for the clauses of a formula in CNF.
+
+    All the literals are kept in a single flat array of C ints and the clauses
+    are delimited by an array of offsets, so a literal costs 4 bytes instead of
+    the 100+ bytes of a Python int inside a Python list. It behaves like the
+    list of lists used by default in the QBF class: clauses can be appended,
+    counted, indexed and iterated (each clause is returned as a list).
+
+
+    Attributes
+    ----------
+    literals : array('i')
+        the literals of all the clauses, one clause after the other
+    offsets : array('q')
+        offsets[k] is the position in literals where the k-th clause starts;
+        the last element is the total number of literals
+
+    Methods
+    -------
+    append(C)
+        Adds the clause C (an iterable of integers) at the end of the store.
+
+    extend(clauses)
+        Adds every clause of an iterable of clauses.
+
+    get_n_literals()
+        Returns the total number of literals in the store.
+
+    """
+
+    __slots__ = ('literals', 'offsets')
+
+    def __init__(self, clauses=()):
+        self.literals = array('i')
+        self.offsets = array('q', [0])
+        self.extend(clauses)
+
+    def append(self, C):
+        self.literals.extend(C)
+        self.offsets.append(len(self.literals))
+
+    def extend(self, clauses):
+        for C in clauses:
+            self.append(C)
+
+    def get_n_literals(self):
+        return len(self.literals)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, k):
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError("clause index out of range")
+        return self.literals[self.offsets[k]:self.offsets[k + 1]].tolist()
+
+    def __iter__(self):
+        literals = self.literals
+        start = 0
+        for end in self.offsets[1:]:
+            yield literals[start:end].tolist()
+            start = end
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Imports:
+from instance_encodings.QBC import QBC, AND, OR
+from instance_encodings.qdimacs_reader import next_line
+import numpy as np
+import mmap
+import gc
+import os
+
+CHUNK_BYTES = 1 << 24 # bytes of gates parsed at a time
+
+# Translation blanking the punctuation, and bytes of the integers:
+BLANK_PUNCTUATION = bytes.maketrans(b"(),=\t\r\n", b"       ")
+NUMBER_BYTES = b"0123456789- "
+
+###############################################################################
+#================================ QCIR READER ================================#
+###############################################################################
+
+def read_QCIR(path, name=None, chunk_bytes=CHUNK_BYTES):
+    """
+    Reads a QCIR file into a QBC whose gates are kept in the integer gate
+    table.
+
+    NOTE: the file is memory-mapped and parsed in large blocks by NumPy, so
+          no string object is created per line or per literal: every block
+          of about chunk_bytes ending at a line break is checked, its
+          punctuation and words are blanked, all its integers are parsed at
+          once and the commas give the number of inputs of every gate.
+
+    NOTE: only the subset of QCIR-G14 written by the generators is read:
+          variables and gates are positive integers, the quantifiers are
+          'exists' and 'forall', the gates are 'and' and 'or' and are written
+          as 'c = and(x1, ..., xk)'. Lines may be indented, and comment
+          lines (starting with '#') and blank lines may appear anywhere.
+          Anything else raises a ValueError.
+
+    -Input-: the path of a QCIR file, the name of the circuit (the name of the
+    file without the extension if None) and the size in bytes of the blocks
+    -Precondition-: the identifiers fit in a C int
+    -Output-: a QBC with int_gates=True
+    -Postcondition-: the prefix, the output gate and the gates of the QBC are
+    those of the file, its number of variables is the number of quantified
+    variables and its number of gates the number of gate lines.
+    -Cost-: Θ(size of the file)
+    """
+
+    if name is None:
+        name = os.path.splitext(os.path.basename(path))[0]
+
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise ValueError("empty QCIR file '{}'".format(path))
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # the gates start after the output line
+            pos = find_output(mm)
+            if pos == -1:
+                raise ValueError("missing 'output' line in '{}'".format(path))
+            end = next_line(mm, pos)
+            line = mm[pos:end].strip()
+            if not line.endswith(b')'):
+                raise ValueError("bad 'output' line in '{}'".format(path))
+            output_gate = int(line[len(b'output('):-1])
+
+            prefix = parse_prefix(mm[:pos], path)
+            C = QBC(sum([len(X) for _, X in prefix]), 0, output_gate, name, int_gates=True)
+            C.set_prefix(prefix)
+            parse_gates(mm, end, len(mm), C, path, chunk_bytes)
+            C.m = C.get_n_defined_gates()
+    return C
+
+###############################################################################
+###############################################################################
+
+# =============================== Block parsing ============================== #
+
+def find_output(mm):
+    """
+    Returns the position where the output line of the QCIR file in mm starts
+    (-1 if there is none), i.e., the first line whose first non-blank bytes
+    are 'output('.
+    """
+
+    pos = mm.find(b'output(')
+    while pos != -1:
+        start = mm.rfind(b'\n', 0, pos) + 1
+        if not mm[start:pos].strip(b' \t\r'):
+            return start
+        pos = mm.find(b'output(', pos + 1)
+    return -1
+
+def is_blank(B):
+    """
+    Returns, for every byte of B, whether it is a space, a tab or a carriage
+    return.
+    """
+
+    return (B == ord(' ')) | (B == ord('\t')) | (B == ord('\r'))
+
+def get_lines(A):
+    """
+    Returns the positions of the first non-blank byte of the lines of A (an
+    array of bytes of whole lines, each one ending with a line break), except
+    for the comment lines and the lines holding only blanks. The comment lines
+    are blanked.
+    """
+
+    breaks = np.flatnonzero(A == ord('\n'))
+    starts = np.concatenate(([0], breaks[:-1] + 1))
+    # skip the indentation, one byte of every indented line at a time (the
+    # line break stops it)
+    indented = np.flatnonzero(is_blank(A[starts]))
+    while len(indented) > 0:
+        starts[indented] += 1
+        indented = indented[is_blank(A[starts[indented]])]
+    comments = A[starts] == ord('#')
+    lines = starts[~comments & (A[starts] != ord('\n'))]
+    for start, stop in zip(starts[comments].tolist(), breaks[comments].tolist()):
+        A[start:stop] = ord(' ')
+    return lines
+
+def parse_lists(A, starts, heads, path):
+    """
+    Parses the lines of A starting at starts, each of the form
+    'head(x1, ..., xk)' with heads integers in the head, whose words are
+    blanked beforehand. Returns, for every line, the index of its first
+    integer and its number k of arguments, and all the integers in order.
+    """
+
+    opens = np.flatnonzero(A == ord('('))
+    if len(opens) != len(starts) or np.any(opens < starts) or \
+       np.any(opens[:-1] >= starts[1:]) or np.count_nonzero(A == ord(')')) != len(starts):
+        raise ValueError("expected one '(...)' per line in '{}'".format(path))
+
+    # the commas of every line give its number of arguments
+    commas = np.flatnonzero(A == ord(','))
+    counts = np.diff(np.searchsorted(commas, starts), append=len(commas)) + 1
+    counts[A[opens + 1] == ord(')')] = 0
+    first = np.cumsum(counts + heads) - counts - heads
+
+    # a sign starts a literal and is followed by a digit (the first byte of a
+    # line is not a sign and the last one is a line break)
+    signs = np.flatnonzero(A == ord('-'))
+    before, after = A[signs - 1], A[signs + 1]
+    if np.any((before >= ord('0')) & (before <= ord('9'))) or \
+       np.any((after < ord('0')) | (after > ord('9'))):
+        raise ValueError("bad literal in '{}'".format(path))
+
+    text = A.tobytes().translate(BLANK_PUNCTUATION)
+    if text.translate(None, NUMBER_BYTES):
+        raise ValueError("unexpected characters in '{}': only integer "
+                         "identifiers are supported".format(path))
+    values = np.fromstring(text, dtype=np.int64, sep=' ')
+    if len(values) != len(starts) * heads + counts.sum():
+        raise ValueError("bad line in '{}'".format(path))
+    if len(values) > 0 and np.abs(values).max() > np.iinfo(np.int32).max:
+        raise ValueError("identifier too large in '{}'".format(path))
+    return first, counts, values.astype(np.int32)
+
+def matches(A, positions, word):
+    """
+    Returns, for every position, whether the bytes of A starting there are
+    those of word.
+    """
+
+    result = np.ones(len(positions), dtype=bool)
+    for k, byte in enumerate(word):
+        result &= A[positions + k] == byte
+    return result
+
+def parse_prefix(text, path):
+    """
+    Parses the part of a QCIR file (as bytes) before the output line into a
+    prefix, i.e., a list of blocks [Q, X] as in the QBC class.
+
+    -Cost-: Θ(len(text))
+    """
+
+    if not text:
+        return list()
+    A = np.frombuffer(bytearray(text), dtype=np.uint8)
+    starts = get_lines(A)
+    if len(starts) == 0:
+        return list()
+    if np.any(starts + 7 > len(A)):
+        raise ValueError("bad quantifier line in '{}'".format(path))
+    exists = matches(A, starts, b'exists(')
+    forall = matches(A, starts, b'forall(')
+    if not np.all(exists | forall):
+        raise ValueError("expected 'exists' or 'forall' lines in '{}'".format(path))
+    for k in range(6):
+        A[starts + k] = ord(' ')
+
+    _, counts, values = parse_lists(A, starts, 0, path)
+    ends = np.cumsum(counts).tolist()
+    quantifiers = np.where(exists, ord('e'), ord('a')).astype(np.uint8).tobytes().decode()
+    values = values.tolist() # slicing a list is much faster than an array
+
+    # the blocks are millions of small lists: the garbage collector would go
+    # through all of them again and again while they are created
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        prefix = list()
+        start = 0
+        for Q, end in zip(quantifiers, ends):
+            prefix.append([Q, values[start:end]])
+            start = end
+    finally:
+        if enabled:
+            gc.enable()
+    return prefix
+
+def parse_gates(mm, start, end, C, path, chunk_bytes=CHUNK_BYTES):
+    """
+    Parses the gate lines of a QCIR file held in mm[start:end] into the
+    integer gate table of the QBC C, chunk_bytes at a time.
+
+    -Cost-: Θ(end - start)
+    """
+
+    while start < end:
+        stop = end
+        if start + chunk_bytes < end:
+            cut = mm.rfind(b'\n', start, start + chunk_bytes)
+            stop = end if cut == -1 else cut + 1
+
+        data = bytearray(mm[start:stop])
+        if data[-1:] != b'\n':
+            data += b'\n'
+        A = np.frombuffer(data, dtype=np.uint8)
+        starts = get_lines(A)
+        if len(starts) > 0:
+            # the operation of every gate comes right before its '('
+            opens = np.flatnonzero(A == ord('('))
+            if len(opens) != len(starts) or np.any(opens < 5):
+                raise ValueError("expected one '(...)' per line in '{}'".format(path))
+            is_and = matches(A, opens - 5, b'= and')
+            is_or = matches(A, opens - 4, b'= or')
+            if not np.all(is_and | is_or):
+                raise ValueError("expected 'and' or 'or' gates in '{}'".format(path))
+            for k in range(1, 4):
+                A[opens[is_and] - k] = ord(' ')
+            for k in range(1, 3):
+                A[opens[is_or] - k] = ord(' ')
+
+            # the identifier of every gate comes before its inputs
+            heads, counts, values = parse_lists(A, starts, 1, path)
+            inputs = np.delete(values, heads)
+
+            C.gate_ids.frombytes(values[heads].tobytes())
+            C.gate_ops.frombytes(np.where(is_and, AND, OR).astype(np.int8).tobytes())
+            offsets = np.cumsum(counts) + len(C.gate_inputs)
+            C.gate_inputs.frombytes(inputs.tobytes())
+            C.gate_offsets.frombytes(offsets.astype(np.int64).tobytes())
+        start = stop
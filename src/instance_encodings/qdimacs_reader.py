@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Imports:
+from instance_encodings.QBF import QBF
+from instance_encodings.clause_store import ClauseStore
+import numpy as np
+import mmap
+import gc
+import os
+
+CHUNK_BYTES = 1 << 26 # bytes of clauses parsed at a time
+
+###############################################################################
+#=============================== QDIMACS READER ==============================#
+###############################################################################
+
+def read_QDIMACS(path, name=None, chunk_bytes=CHUNK_BYTES):
+    """
+    Reads a QDIMACS file into a QBF whose clauses are kept in a ClauseStore.
+
+    NOTE: the file is memory-mapped and parsed in large blocks by NumPy, so
+          no string object is created per line or per literal: the clause
+          section is cut into blocks of about chunk_bytes ending at a line
+          break, every block is parsed into integers at once and the zeros
+          give the offsets of the clauses. Comments are only allowed before
+          the 'p cnf' line. A ValueError is raised if the last clause has no
+          terminating zero or if the number of clauses is not the one of the
+          'p cnf' line.
+
+    -Input-: the path of a QDIMACS file, the name of the formula (the name of
+    the file without the extension if None) and the size in bytes of the
+    blocks
+    -Precondition-: the file is a valid QDIMACS file whose literals fit in
+    a C int
+    -Output-: a QBF with store='array'
+    -Postcondition-: the number of variables and clauses of the QBF are those
+    of the 'p cnf' line, its prefix and its clauses are those of the file.
+    -Cost-: Θ(size of the file)
+    """
+
+    if name is None:
+        name = os.path.splitext(os.path.basename(path))[0]
+
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise ValueError("empty QDIMACS file '{}'".format(path))
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # header, after the comments
+            pos = 0
+            while mm[pos:pos + 1] in (b'c', b'\n'):
+                pos = next_line(mm, pos)
+            words = mm[pos:next_line(mm, pos)].split()
+            if words[:2] != [b'p', b'cnf'] or len(words) != 4:
+                raise ValueError("missing 'p cnf' line in '{}'".format(path))
+            n, m = int(words[2]), int(words[3])
+            pos = next_line(mm, pos)
+
+            # the prefix ends with the last line starting with a quantifier
+            last = max(mm.rfind(b'\ne ', pos - 1), mm.rfind(b'\na ', pos - 1))
+            end = pos if last == -1 else next_line(mm, last + 1)
+
+            phi = QBF(n, m, name, store='array')
+            phi.set_prefix(parse_prefix(mm[pos:end]))
+            clauses = parse_clauses(mm, end, len(mm), path, chunk_bytes)
+            if len(clauses) != m:
+                raise ValueError("{} clauses instead of {} in '{}'".format(
+                    len(clauses), m, path))
+            phi.set_clauses(clauses)
+    return phi
+
+###############################################################################
+###############################################################################
+
+# =============================== Block parsing ============================== #
+
+def next_line(mm, pos):
+    """
+    Returns the position where the line after the one containing pos starts
+    (the size of mm if it is the last line).
+    """
+
+    end = mm.find(b'\n', pos)
+    return len(mm) if end == -1 else end + 1
+
+def parse_prefix(text):
+    """
+    Parses the quantifier lines of a QDIMACS file (as bytes) into a prefix,
+    i.e., a list of blocks [Q, X] as in the QBF class.
+
+    -Cost-: Θ(len(text))
+    """
+
+    if not text:
+        return list()
+
+    A = np.frombuffer(text, dtype=np.uint8).copy()
+    starts = np.concatenate(([0], np.flatnonzero(A[:-1] == ord('\n')) + 1))
+    starts = starts[(A[starts] == ord('e')) | (A[starts] == ord('a'))]
+    quantifiers = A[starts].tobytes().decode()
+    A[starts] = ord(' ') # only the variables and the terminating zeros remain
+
+    values = np.fromstring(A.tobytes(), dtype=np.int64, sep=' ')
+    ends = np.flatnonzero(values == 0).tolist()
+    values = values.tolist() # slicing a list is much faster than an array
+
+    # the blocks are millions of small lists: the garbage collector would go
+    # through all of them again and again while they are created
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        prefix = list()
+        start = 0
+        for Q, end in zip(quantifiers, ends):
+            prefix.append([Q, values[start:end]])
+            start = end + 1
+    finally:
+        if enabled:
+            gc.enable()
+    return prefix
+
+def parse_clauses(mm, start, end, path, chunk_bytes=CHUNK_BYTES):
+    """
+    Parses the clause lines of a QDIMACS file held in mm[start:end] into a
+    ClauseStore, chunk_bytes at a time. Raises a ValueError if the last
+    clause is not terminated by a zero.
+
+    -Cost-: Θ(end - start)
+    """
+
+    store = ClauseStore()
+    literals, offsets = store.literals, store.offsets
+    while start < end:
+        stop = end
+        if start + chunk_bytes < end:
+            cut = mm.rfind(b'\n', start, start + chunk_bytes)
+            stop = end if cut == -1 else cut + 1
+
+        values = np.fromstring(mm[start:stop], dtype=np.int32, sep=' ')
+        zeros = np.flatnonzero(values == 0)
+        # the k-th zero closes a clause ending after values[:zeros[k]] minus
+        # the k previous zeros
+        ends = zeros - np.arange(len(zeros)) + len(literals)
+        literals.frombytes(values[values != 0].tobytes())
+        offsets.frombytes(ends.astype(np.int64).tobytes())
+        start = stop
+
+    if len(literals) != offsets[-1]: # literals after the last zero
+        raise ValueError("unterminated clause at the end of '{}'".format(path))
+    return store
@@ -14,8 +14,8 @@ Created on Mon Jul 22 12:21:06 2019
 
 # -*- coding: utf-8 -*-
 
-from tools.system_tools import run_command
-from time import time
+from tools.solver_runner import run_benchmark
+from tools.result_cache import ResultCache
 
 
 print(" === SIMPLE CHECKER ===")
@@ -24,17 +24,21 @@ print("This module will check Type 2 formulas in QDIMACS format.")
 #n = int(n)
 
 n = 15
-
+workers = 4            # solver runs at the same time
+time_limit = 1800      # CPU time limit of every run (s)
+memory_limit = 8 << 30 # memory limit of every run (bytes)
+force = False          # True to solve again the instances already solved
+
+instances = ["./output_files/type2/QDIMACS/type2_size{}_cnf.qdimacs".format(i)
+             for i in range(1, n + 1)]
+results = run_benchmark({'caqe': ['./solvers/caqe']}, instances,
+                        "./output_files/caqe_t2_results.csv", workers,
+                        time_limit, memory_limit, cache=ResultCache(),
+                        force=force)
+
+# CPU times in order of n, as read by graphics.py
 filename = "./output_files/" + "caqe_t2_times1.txt"
 file = open(filename, 'w')
-
-for i in range(1, n + 1):
-    print("Checking on CAQE... (n = {})".format(i))
-    t0 = time()
-    run_command("./solvers/caqe ./output_files/type2/QDIMACS/type2_size{}_cnf.qdimacs".format(i))
-    t = time() - t0
-    print("{} s".format(t)) 
-    file.write(str(t) + "\n")
-
-
-file.close()
\ No newline at end of file
+for _, _, r in results:
+    file.write(str(r.cpu_time) + "\n")
+file.close()
@@ -3,10 +3,19 @@
 
 # Imports:
 #from instance_encodings.QBF import QBF
-from generators.generator_for_T1 import generate_ChenType1
-from generators.generator_for_T2 import generate_ChenType2 
+from generators.generator_for_T1 import generate_ChenType1, write_ChenType1
+from generators.generator_for_T2 import generate_ChenType2, write_ChenType2_QCIR
+from generators import slow_generator_for_T2
+from external_tools import qcir_to_qdimacs
+from itertools import product
 from time import time
-import matplotlib.pyplot as plt
+from array import array
+import tracemalloc
+import random
+import gc
+import argparse
+import filecmp
+import os
 
 def T1_simple_test(n, output, mode, checkSat):
     phi = generate_ChenType1(int(n))
@@ -17,8 +26,8 @@ def T1_simple_test(n, output, mode, checkSat):
     phi.print_formula(mode, output, filename)
     if checkSat == "no":
         return
-    r, t = phi.check_satisfiability(solver=checkSat)
-    print("Satisfiability results: {}, in {} seconds.".format(r, t))
+    r = phi.check_satisfiability(solver=checkSat)
+    print("Satisfiability results: {}, in {} seconds.".format(r.status, r.cpu_time))
     
 def T2_simple_test(n, output):
     phi = generate_ChenType2(int(n))
@@ -29,29 +38,58 @@ def T2_simple_test(n, output):
     phi.print_formula(output, filename)
     #if checkSat == "no":
     #    return
-    #r, t = phi.check_satisfiability(solver=checkSat)
-    #print("Satisfiability results: {}, in {} seconds.".format(r, t))
+    #r = phi.check_satisfiability(solver=checkSat)
+    #print("Satisfiability results: {}, in {} seconds.".format(r.status, r.cpu_time))
+    
+def T1_repeated_tests(n, displayData=True, time_limit=None, memory_limit=None, adaptive=False, solver='depqbf'):
+    """
+    Generates and solves the Type 1 formulas up to size n on the given solver,
+    stopping at the first timeout. If adaptive is True, only O(log n) sizes
+    are solved: n grows geometrically and then the time-out frontier is
+    bisected (see adaptive_sweep). The measured curve is printed, plotted if
+    displayData is True, and returned as a list of tuples (n, generation
+    time, solving time, status) in increasing order of n.
+    """
     
-def T1_repeated_tests(n, displayData=True):
     n = int(n)
-    generate = list()
-    solve = list()
-    for i in range(1, n + 1):
-
+    curve = list() # tuples (n, generation time, solving time, status)
+    
+    def solves(i):
         print("")
         t0 = time()
         phi = generate_ChenType1(i)
         t = time() - t0
-        generate.append(t)
         print("Time for GENERATING with size n = {}: {} s".format(i, t))
 
-        res, t = phi.check_satisfiability()
-        solve.append(t)
-        print("Time for SOLVING size n = {}: {} s".format(i, t))
-        print(res)
+        res = phi.check_satisfiability(solver, time_limit, memory_limit)
+        curve.append((i, t, res.cpu_time, res.status))
+        print("Time for SOLVING size n = {}: {} s".format(i, res.cpu_time))
+        print(res.status)
+        return not res.timed_out
+    
+    if adaptive:
+        largest = adaptive_sweep(solves, n)
+    else:
+        largest = 0
+        for i in range(1, n + 1):
+            if not solves(i):
+                print("Timed out: larger sizes are skipped.")
+                break
+            largest = i
+    
+    curve.sort()
+    print("")
+    print("Largest n solved: {}".format(largest))
+    for i, t_gen, t_solve, status in curve:
+        print("n = {}: generated in {} s, solved in {} s ({})".format(i, t_gen, t_solve, status))
+    sizes = [point[0] for point in curve]
+    generate = [point[1] for point in curve]
+    solve = [point[2] for point in curve]
     
     if not displayData:
-        return
+        return curve
+    
+    import matplotlib.pyplot as plt
     
     r_n = list()
     r_m = list()
@@ -66,11 +104,618 @@ def T1_repeated_tests(n, displayData=True):
     print("In GREEN: 9n + 4 (rate od growth for the vars.)")
     print("In BLUE: 12n + 6 (rate of growth for the clauses)")
     
-    plt.plot(range(1, n + 1), generate, 'ro')
+    plt.plot(sizes, generate, 'ro')
     plt.show()
     print("FIGURE 2:")
     print("Time needed to generate the formulas.")
     
-    plt.plot(range(1, n + 1), solve, 'ro')
+    plt.plot(sizes, solve, 'ro')
     plt.show()
-    print("FIGURE 3: performance of the solver")
\ No newline at end of file
+    print("FIGURE 3: performance of the solver")
+    return curve
+    
+def adaptive_sweep(solves, max_n=None):
+    """
+    Returns the largest n ≤ max_n for which solves(n) is True (0 if none),
+    assuming that solves is True up to some frontier and False after it.
+    
+    NOTE: n doubles from 1 until the first failure (or max_n) and then the
+          frontier is bisected between the last success and the first failure,
+          so solves is called O(log n) times instead of n times.
+    """
+    
+    lo, hi = 0, None # largest success and smallest failure
+    n = 1
+    while hi is None:
+        if not solves(n):
+            hi = n
+        elif max_n is not None and n >= max_n:
+            return n
+        else:
+            lo = n
+            n = 2*n if max_n is None else min(2*n, max_n)
+    
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if solves(mid):
+            lo = mid
+        else:
+            hi = mid
+    return lo
+    
+def QDIMACS_writing_benchmark(n, filename="benchmark.qdimacs"):
+    """
+    Writes a Type 1 formula of size n onto ./output_files/filename, first
+    converting it to a single string and then streaming it in chunks, and
+    prints the throughput of both paths in bytes per second.
+    """
+    
+    phi = generate_ChenType1(int(n))
+    path = "./output_files/" + filename
+    
+    for label, stream in [("string", False), ("stream", True)]:
+        t0 = time()
+        phi.print_formula('QDIMACS', 'file', filename, stream)
+        t = time() - t0
+        size = os.path.getsize(path)
+        print("[{}] {} bytes in {} s: {} bytes/s".format(label, size, t, size / t))
+    
+    os.remove(path)
+    
+def T1_generation_benchmark(n, filename="benchmark.qdimacs"):
+    """
+    Writes a Type 1 formula of size n in QDIMACS onto ./output_files/filename
+    with the QBF object, with the direct-emit generator and with the NumPy
+    generator (if NumPy is available), and prints the time taken by each one.
+    """
+    
+    n = int(n)
+    path = "./output_files/" + filename
+    
+    def write_object(n, out):
+        generate_ChenType1(n).write_QDIMACS(out)
+    
+    writers = [("object", write_object), ("direct", write_ChenType1)]
+    try:
+        from generators.vectorized_generator_for_T1 import write_ChenType1_arrays
+        writers.append(("numpy", write_ChenType1_arrays))
+    except ImportError:
+        print("NumPy is not available: skipping the vectorized generator.")
+    
+    for label, write in writers:
+        t0 = time()
+        file = open(path, 'w')
+        write(n, file)
+        file.close()
+        t = time() - t0
+        size = os.path.getsize(path)
+        print("[{}] {} bytes in {} s: {} bytes/s".format(label, size, t, size / t))
+    
+    os.remove(path)
+    
+def QDIMACS_reading_benchmark(n, filename="benchmark.qdimacs"):
+    """
+    Writes a Type 1 formula of size n in QDIMACS onto ./output_files/filename
+    (n = 5·10^6 gives a file of about 2.5 GB) and reads it back both line by
+    line and with the memory-mapped reader, printing the throughput of each
+    one in MB/s and checking that both give the same clauses.
+    """
+    
+    from instance_encodings.qdimacs_reader import read_QDIMACS
+    from instance_encodings.clause_store import ClauseStore
+    
+    n = int(n)
+    path = "./output_files/" + filename
+    file = open(path, 'w', buffering=1 << 20)
+    write_ChenType1(n, file)
+    file.close()
+    size = os.path.getsize(path)
+    
+    def read_lines(path):
+        prefix = list()
+        clauses = ClauseStore()
+        file = open(path, 'r')
+        for line in file:
+            if line[0] in 'ea':
+                prefix.append([line[0], [int(x) for x in line.split()[1:-1]]])
+            elif line[0] not in 'cp':
+                clauses.append([int(x) for x in line.split()[:-1]])
+        file.close()
+        return prefix, clauses
+    
+    t0 = time()
+    prefix, clauses = read_lines(path)
+    t = time() - t0
+    print("[lines] {} bytes in {} s: {} MB/s".format(size, t, size / t / 10**6))
+    
+    t0 = time()
+    phi = read_QDIMACS(path)
+    t = time() - t0
+    print("[mmap] {} bytes in {} s: {} MB/s".format(size, t, size / t / 10**6))
+    
+    same = (phi.get_prefix() == prefix and
+            phi.get_clauses().literals == clauses.literals and
+            phi.get_clauses().offsets == clauses.offsets)
+    print("Same formula: {}".format(same))
+    os.remove(path)
+    
+def clause_store_memory_benchmark(sizes=(10**5, 10**6)):
+    """
+    Converts Type 2 circuits of the given sizes to CNF with both clause stores
+    of the QBF class and prints the memory taken by each resulting formula.
+    """
+    
+    for n in sizes:
+        C = generate_ChenType2(int(n))
+        for store in ['list', 'array']:
+            tracemalloc.start()
+            phi = C.convert_to_QDIMACS(store=store)
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            print("[n = {}, {}] {} clauses in {} bytes ({} bytes/clause)".format(
+                n, store, phi.get_n_clauses(), size, size / phi.get_n_clauses()))
+            del phi
+    
+def generate_ChenType2_by_names(n):
+    """
+    Generates a Type 2 circuit of size n as the generator did before its
+    identifiers were computed by index arithmetic: every variable and gate
+    gets the next counter value under its symbolic name, and the inputs of
+    every gate are looked up by name. Only kept as the baseline of
+    T2_generation_benchmark.
+    """
+    
+    from instance_encodings.QBC import QBC, AND, OR
+    
+    phi = QBC(2*n, 17*n - 12, name="type2_size{}".format(n), int_gates=True)
+    dic = dict()
+    
+    def new(name):
+        dic[name] = len(dic) + 1
+        return dic[name]
+    
+    for i in range(1, n + 1):
+        phi.add_quantifier_block('e', [new('x' + str(i))])
+        phi.add_quantifier_block('a', [new('y' + str(i))])
+    
+    for name in ['s_1_0', 's_1_1', 's_1_2', 'xor_1', 'xor_2']:
+        new(name)
+    phi.add_int_gate(dic['s_1_0'], AND, [-dic['x1'], -dic['y1']])
+    phi.add_int_gate(dic['xor_1'], AND, [dic['x1'], -dic['y1']])
+    phi.add_int_gate(dic['xor_2'], AND, [-dic['x1'], dic['y1']])
+    phi.add_int_gate(dic['s_1_1'], OR, [dic['xor_1'], dic['xor_2']])
+    phi.add_int_gate(dic['s_1_2'], AND, [dic['x1'], dic['y1']])
+    
+    for k in range(2, n + 1):
+        x, y = dic['x' + str(k)], dic['y' + str(k)]
+        adder = [new('adder_{}_{}'.format(k, r)) for r in [0, 1, 2]]
+        xor_1, xor_2 = new('xor_1_{}'.format(k)), new('xor_2_{}'.format(k))
+        phi.add_int_gate(xor_1, AND, [x, -y])
+        phi.add_int_gate(xor_2, AND, [-x, y])
+        phi.add_int_gate(adder[0], AND, [-x, -y])
+        phi.add_int_gate(adder[1], OR, [xor_1, xor_2])
+        phi.add_int_gate(adder[2], AND, [x, y])
+        for m in [0, 1, 2]:
+            aux = [new('aux_{}_{}_{}'.format(k, m, r)) for r in [0, 1, 2]]
+            for r in [0, 1, 2]:
+                phi.add_int_gate(aux[r], AND, [dic['s_{}_{}'.format(k - 1, r)],
+                                               dic['adder_{}_{}'.format(k, (m - r) % 3)]])
+            s_k_m = new('s_{}_{}'.format(k, m))
+            phi.add_int_gate(s_k_m, OR, aux)
+    
+    phi.set_output_gate(-dic['s_{}_{}'.format(n, n % 3)])
+    return phi
+
+def T2_generation_benchmark(n):
+    """
+    Generates a Type 2 circuit of size n with the name-based generator kept
+    as a baseline (generate_ChenType2_by_names), with identifiers computed by
+    index arithmetic and with the symbolic-name dictionary of the trace mode.
+    Prints the number of gates generated per second in each case and returns
+    whether the three circuits are the same.
+    """
+    
+    n = int(n)
+    circuits = list()
+    for label, generate in [("names (baseline)", generate_ChenType2_by_names),
+                            ("arithmetic", generate_ChenType2),
+                            ("arithmetic + names", lambda n: generate_ChenType2(n, {}))]:
+        t0 = time()
+        C = generate(n)
+        t = time() - t0
+        print("[{}] {} gates in {} s: {} gates/s".format(
+            label, C.get_n_defined_gates(), t, C.get_n_defined_gates() / t))
+        circuits.append(C)
+    
+    same = all([C.get_prefix() == circuits[0].get_prefix() and
+                C.get_output_gate() == circuits[0].get_output_gate() and
+                C.get_gates() == circuits[0].get_gates() for C in circuits])
+    print("Same circuit: {}".format(same))
+    return same
+    
+def unit_propagate(clauses, assignment):
+    """
+    Extends the dictionary assignment (variable -> bool) by unit propagation
+    over clauses. Returns False if a clause gets falsified, True otherwise.
+    """
+    
+    changed = True
+    while changed:
+        changed = False
+        for C in clauses:
+            unassigned = list()
+            satisfied = False
+            for lit in C:
+                if abs(lit) not in assignment:
+                    unassigned.append(lit)
+                elif assignment[abs(lit)] == (lit > 0):
+                    satisfied = True
+                    break
+            if satisfied:
+                continue
+            if len(unassigned) == 0:
+                return False
+            if len(unassigned) == 1:
+                assignment[abs(unassigned[0])] = unassigned[0] > 0
+                changed = True
+    return True
+
+def T2_encodings_equivalence_test(max_n):
+    """
+    Checks, for every n from 1 to max_n, that the counter encoding of the slow
+    Type 2 generator is equivalent to the exponential one: for every assignment
+    of the 2n variables, the exponential matrix is satisfied iff unit
+    propagation on the counter matrix assigns every auxiliary variable without
+    falsifying any clause (if it finds a conflict, no extension exists).
+    """
+    
+    for n in range(1, int(max_n) + 1):
+        phi = slow_generator_for_T2.generate_ChenType2(n)
+        psi = slow_generator_for_T2.generate_ChenType2(n, encoding='counter')
+        
+        for values in product([False, True], repeat=2*n):
+            assignment = {v: values[v - 1] for v in range(1, 2*n + 1)}
+            
+            exp_sat = all([any([assignment[abs(lit)] == (lit > 0) for lit in C])
+                           for C in phi.get_clauses()])
+            
+            counter_sat = unit_propagate(psi.get_clauses(), assignment)
+            if counter_sat and len(assignment) != psi.get_n_vars():
+                print("n = {}: auxiliary variables not forced by {}".format(n, values))
+                return False
+            
+            if exp_sat != counter_sat:
+                print("n = {}: encodings differ on {}".format(n, values))
+                return False
+        
+        print("n = {}: {} clauses vs {} clauses, equivalent".format(
+            n, phi.get_n_clauses(), psi.get_n_clauses()))
+    return True
+
+def QCIR_DAG_analysis_scaling_test(sizes=(10**3, 10**4, 10**5), filename="benchmark.qcir"):
+    """
+    Reads the QCIR files of Type 2 circuits of the given sizes with
+    qcir_to_qdimacs and times its DAG analysis and its conversion to QDIMACS.
+    Checks that the support of every circuit is the set of its quantified
+    variables, that its depth is 2n + 1 (two levels per layer), that
+    6(n - 2) of its gates have a fan-out of 3 (the adders and sums of every
+    layer but the last two are used by three gates of the next one), and
+    that the time per gate of the largest circuit is at most three times the
+    one of the smallest (the passes are linear, even though every layer
+    reuses the previous one).
+    """
+    
+    path = os.path.join("./output_files", filename)
+    qcir_to_qdimacs.Glo.args = argparse.Namespace(keep_var_names=0, keep_gate_names=0)
+    rates = list()
+    for n in sizes:
+        n = int(n)
+        with open(path, 'w') as file:
+            write_ChenType2_QCIR(n, file)
+        with qcir_to_qdimacs.ConversionContext():
+            prefix, fmla = qcir_to_qdimacs.read_qcir_file(path)
+            variables = set([v for _, X in prefix for v in X])
+            
+            t0 = time()
+            info = qcir_to_qdimacs.DagInfo(fmla)
+            t_analysis = time() - t0
+            depth = info.depth[fmla]
+            
+            t0 = time()
+            fmla = qcir_to_qdimacs.simplify(qcir_to_qdimacs.to_andor(fmla))
+            qcir_to_qdimacs.write_dimacs(fmla, prefix, os.devnull)
+            t_conversion = time() - t0
+            
+            if info.support != variables:
+                print("n = {}: support of {} variables instead of {}".format(
+                    n, len(info.support), len(variables)))
+                return False
+            if depth != 2*n + 1:
+                print("n = {}: depth {} instead of {}".format(n, depth, 2*n + 1))
+                return False
+            shared = len([g for g in info.order if info.fanout[g] == 3 and
+                          not qcir_to_qdimacs.is_lit(g)])
+            if shared != 6*max(n - 2, 0):
+                print("n = {}: {} gates of fan-out 3 instead of {}".format(
+                    n, shared, 6*max(n - 2, 0)))
+                return False
+            
+            gates = len(info.order)
+        
+        rates.append((t_analysis + t_conversion) / gates)
+        print("n = {}: {} gates, depth {}, analysis in {:.2f} s, "
+              "conversion in {:.2f} s, {:.2f} us/gate".format(
+                  n, gates, depth, t_analysis, t_conversion, 1e6 * rates[-1]))
+    
+    os.remove(path)
+    return rates[-1] <= 3 * rates[0]
+
+def QCIR_batch_memory_test(n=500, conversions=5, filename="benchmark.qcir"):
+    """
+    Converts conversions QCIR files of Type 2 circuits of size n with
+    qcir_to_qdimacs, first all in the same ConversionContext and then each one
+    in its own, and prints the memory held after every conversion (once the
+    garbage is collected). The variables of every circuit are renumbered by
+    a random permutation (the converter keeps the identifiers up to 2n), so
+    the circuits share almost no formula node. Returns whether the memory held by the shared
+    context grows by at least half the footprint of a circuit per
+    conversion, while the one held with a context per conversion stays under
+    a tenth of that footprint.
+    """
+    
+    path = os.path.join("./output_files", filename)
+    qcir_to_qdimacs.Glo.args = argparse.Namespace(keep_var_names=0, keep_gate_names=0)
+    N = 2*n
+    
+    def convert(k):
+        C = generate_ChenType2(n)
+        perm = [0] + random.Random(k).sample(range(1, N + 1), N)
+        rename = lambda v: v if abs(v) > N else (perm[v] if v > 0 else -perm[-v])
+        C.set_prefix([[Q, [rename(v) for v in X]] for Q, X in C.get_prefix()])
+        C.gate_inputs = array('i', [rename(v) for v in C.gate_inputs])
+        with open(path, 'w') as file:
+            C.write_QCIR(file)
+        prefix, fmla = qcir_to_qdimacs.read_qcir_file(path)
+        fmla = qcir_to_qdimacs.simplify(qcir_to_qdimacs.to_andor(fmla))
+        qcir_to_qdimacs.write_dimacs(fmla, prefix, os.devnull)
+    
+    tracemalloc.start()
+    gc.collect()
+    baseline = tracemalloc.get_traced_memory()[0]
+    with qcir_to_qdimacs.ConversionContext():
+        shared = list()
+        for k in range(conversions):
+            convert(k)
+            gc.collect()
+            shared.append(tracemalloc.get_traced_memory()[0] - baseline)
+    scoped = list()
+    for k in range(conversions):
+        with qcir_to_qdimacs.ConversionContext():
+            convert(k)
+        gc.collect()
+        scoped.append(tracemalloc.get_traced_memory()[0] - baseline)
+    tracemalloc.stop()
+    os.remove(path)
+    
+    for k in range(conversions):
+        print("conversion {}: {:.2f} MB held with a shared context, {:.2f} MB with a "
+              "context per conversion".format(k + 1, shared[k] / 2**20, scoped[k] / 2**20))
+    footprint = shared[0]
+    return (shared[-1] - shared[0] >= (conversions - 1) * footprint / 2 and
+            max(scoped) < footprint / 10)
+
+def T2_conversion_benchmark(n, filename="benchmark"):
+    """
+    Converts a Type 2 circuit of size n to QDIMACS with qcir_to_qdimacs in two
+    ways: through its QCIR file (writing the text, parsing it and converting
+    it, as running the script does) and in-process from the gate table of the
+    QBC object (write_simplified_QDIMACS). Prints the time of every step and
+    returns whether both outputs are the same.
+    """
+    
+    path = os.path.join("./output_files", filename)
+    C = generate_ChenType2(int(n))
+    qcir_to_qdimacs.Glo.args = argparse.Namespace(keep_var_names=1, keep_gate_names=0,
+                                                  native_ite=0, fmt='qdimacs')
+    
+    t0 = time()
+    with open(path + ".qcir", 'w') as file:
+        C.write_QCIR(file)
+    t_write = time() - t0
+    with qcir_to_qdimacs.ConversionContext():
+        t0 = time()
+        prefix, fmla = qcir_to_qdimacs.read_qcir_file(path + ".qcir")
+        t_parse = time() - t0
+        t0 = time()
+        qcir_to_qdimacs.convert(prefix, fmla, path + "_text.qdimacs", qcir_to_qdimacs.Glo.args)
+        t_convert = time() - t0
+    t_text = t_write + t_parse + t_convert
+    print("[text] QCIR written in {:.2f} s, parsed in {:.2f} s, converted in {:.2f} s: "
+          "{:.2f} s".format(t_write, t_parse, t_convert, t_text))
+    
+    t0 = time()
+    C.write_simplified_QDIMACS(path + "_gates.qdimacs")
+    t_gates = time() - t0
+    print("[gate table] converted in {:.2f} s ({:.2f}x faster)".format(t_gates, t_text / t_gates))
+    
+    same = filecmp.cmp(path + "_text.qdimacs", path + "_gates.qdimacs", shallow=False)
+    for suffix in (".qcir", "_text.qdimacs", "_gates.qdimacs"):
+        os.remove(path + suffix)
+    return same
+
+def QCIR_reading_benchmark(n, filename="benchmark.qcir"):
+    """
+    Writes a Type 2 circuit of size n in QCIR onto ./output_files/filename
+    (n = 10^6 gives a file of about 600 MB) and reads it back both with the
+    line by line parser of qcir_to_qdimacs and with the memory-mapped reader,
+    printing the throughput of each one in MB/s (the memory-mapped reader
+    should reach about 50 MB/s, against about 3 MB/s for the parser of the
+    script) and returning whether the gate table read is the one written.
+    """
+    
+    from instance_encodings.qcir_reader import read_QCIR
+    
+    n = int(n)
+    path = "./output_files/" + filename
+    C = generate_ChenType2(n)
+    file = open(path, 'w', buffering=1 << 20)
+    C.write_QCIR(file)
+    file.close()
+    size = os.path.getsize(path)
+    
+    qcir_to_qdimacs.Glo.args = argparse.Namespace(keep_var_names=1, keep_gate_names=0,
+                                                  native_ite=0, fmt='qdimacs')
+    with qcir_to_qdimacs.ConversionContext():
+        t0 = time()
+        qcir_to_qdimacs.read_qcir_file(path)
+        t_lines = time() - t0
+    print("[lines] {} bytes in {:.2f} s: {:.1f} MB/s".format(size, t_lines, size / t_lines / 10**6))
+    
+    t0 = time()
+    D = read_QCIR(path)
+    t_mmap = time() - t0
+    print("[mmap] {} bytes in {:.2f} s: {:.1f} MB/s ({:.1f}x faster)".format(
+        size, t_mmap, size / t_mmap / 10**6, t_lines / t_mmap))
+    
+    same = (D.get_prefix() == C.get_prefix() and
+            D.get_output_gate() == C.get_output_gate() and
+            D.gate_ids == C.gate_ids and D.gate_ops == C.gate_ops and
+            D.gate_offsets == C.gate_offsets and D.gate_inputs == C.gate_inputs)
+    print("Same circuit: {}".format(same))
+    os.remove(path)
+    return same
+
+def QCIR_reader_format_test(filename="test.qcir"):
+    """
+    Reads small QCIR files with read_QCIR: files of the supported subset
+    (with indented lines, comments, blank lines and CRLF line breaks) must
+    give the expected prefix, output gate and gates, and files outside of it
+    must raise a ValueError instead of giving a wrong circuit. Returns whether
+    every file is read as expected.
+    """
+    
+    from instance_encodings.qcir_reader import read_QCIR
+    
+    path = "./output_files/" + filename
+    good = [
+        (b"exists(1, 2)\noutput(3)\n 3 = and(1, 2)\n",
+         [['e', [1, 2]]], 3, [('3', 'and', ['1', '2'])]),
+        (b"#QCIR-G14\n  exists(1, 2)\n\tforall(4)\n   output(-5)\n \t3 = and(1, -4)\n"
+         b"   # comment\n  \n\t\n5 = or(-3, 2)",
+         [['e', [1, 2]], ['a', [4]]], -5, [('3', 'and', ['1', '-4']), ('5', 'or', ['-3', '2'])]),
+        (b"#QCIR-G14\r\n# output(9)\r\nexists(1)\r\nforall()\r\n\r\noutput(2)\r\n2 = or()\r\n",
+         [['e', [1]], ['a', []]], 2, [('2', 'or', [])]),
+    ]
+    bad = [b"exists(1)\noutput(2)\n2 = xor(1, 1)\n", b"exists(x)\noutput(2)\n2 = and(x)\n",
+           b"free(1)\noutput(2)\n2 = and(1)\n", b"exists(1)\n2 = and(1)\n", b"",
+           b"exists(1)\noutput(2)\n2 = and(1, )\n", b"exists(1)\noutput(2)\n2 = and(1 3)\n",
+           b"exists(1)\noutput(2)\n 2 = and(1)(\n", b"exists(1)\noutput(2)\n2 = and(99999999999)\n",
+           b"exists(1)\noutput(2)\n2 = and(- 1)\n", b"exists(1)\noutput(2)\n2 = and(1-1)\n",
+           b"exists(1)\noutput(2)\n  x 2 = and(1)\n"]
+    
+    passed = True
+    for text, prefix, output_gate, gates in good:
+        with open(path, 'wb') as file:
+            file.write(text)
+        C = read_QCIR(path)
+        if (C.get_prefix(), C.get_output_gate(), C.get_gates()) != (prefix, output_gate, gates):
+            print("Wrong circuit read from {}".format(text))
+            passed = False
+    for text in bad:
+        with open(path, 'wb') as file:
+            file.write(text)
+        try:
+            read_QCIR(path)
+            print("No error on {}".format(text))
+            passed = False
+        except ValueError:
+            pass
+    os.remove(path)
+    return passed
+
+def solver_runner_test(filename="runner"):
+    """
+    Drives the solver runners with tools/fake_solver.py instead of a real
+    solver and checks the SolverResult of every run: the answer parsed from
+    the output, the CPU time, wall time and memory limits, the instance
+    streamed onto stdin (also when the solver stops reading it), the runs of
+    run_benchmark and the hits and misses of a ResultCache, whose keys must
+    tell apart runs with different limits. Prints every failed check and
+    returns whether all of them passed.
+    """
+    
+    from tools.system_tools import run_solver
+    from tools.solver_runner import run_benchmark
+    from tools.result_cache import ResultCache
+    import warnings
+    import sys
+    
+    fake = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                         "tools", "fake_solver.py")]
+    path = "./output_files/" + filename
+    phi = generate_ChenType1(3)
+    with open(path + ".qdimacs", 'w') as file:
+        write_ChenType1(3, file)
+    instance = path + ".qdimacs"
+    
+    failures = list()
+    def check(passed, message):
+        if not passed:
+            print("FAILED: " + message)
+            failures.append(message)
+    
+    r = run_solver(fake + ['--answer', 'sat', instance])
+    check(r.status == 'SAT' and r.exit_code == 10 and not r.timed_out and
+          r.output.startswith("s cnf 1"), "SAT answer: {}".format(r[:6]))
+    r = run_solver(fake + [instance])
+    check(r.status == 'UNSAT' and r.exit_code == 20 and not r.timed_out,
+          "UNSAT answer: {}".format(r[:6]))
+    
+    r = run_solver(fake + ['--burn', '10', instance], time_limit=1)
+    check(r.timed_out and r.status == 'UNKNOWN' and 0.5 <= r.cpu_time < 3,
+          "CPU time limit: {}".format(r[:6]))
+    r = run_solver([sys.executable, '-c', 'import time; time.sleep(10)'], wall_limit=1)
+    check(r.timed_out and r.status == 'UNKNOWN' and r.wall_time < 5,
+          "wall time limit: {}".format(r[:6]))
+    r = run_solver(fake + ['--alloc', '500', instance], memory_limit=200 << 20)
+    check(r.status == 'UNKNOWN' and r.exit_code not in (10, 20) and not r.timed_out,
+          "memory limit: {}".format(r[:6]))
+    r = run_solver(fake + ['--alloc', '100', instance])
+    check(r.status == 'UNSAT' and r.peak_rss >= 100 << 20,
+          "peak RSS of 100 MB: {}".format(r[:6]))
+    
+    r = run_solver(fake, write_input=phi.write_QDIMACS)
+    check(r.status == 'UNSAT' and r.output.split()[3:5] ==
+          [str(phi.get_n_vars()), str(phi.get_n_clauses())],
+          "instance on stdin: {}".format(r[:7]))
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        r = run_solver(['true'], write_input=generate_ChenType1(2000).write_QDIMACS)
+        gc.collect()
+    check(r.exit_code == 0 and not caught,
+          "solver not reading stdin: {} {}".format(r[:6], [str(w.message) for w in caught]))
+    
+    cache = ResultCache(path + ".sqlite")
+    def rows():
+        return cache.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    solvers = {'sat': fake + ['--answer', 'sat'], 'unsat': fake}
+    first = run_benchmark(solvers, [instance], path + ".csv", workers=2,
+                          time_limit=5, verbose=False, cache=cache)
+    check([(name, r.status) for name, _, r in first] == [('sat', 'SAT'), ('unsat', 'UNSAT')],
+          "run_benchmark: {}".format([r[:6] for _, _, r in first]))
+    second = run_benchmark(solvers, [instance], path + ".csv", workers=2,
+                           time_limit=5, verbose=False, cache=cache)
+    check(second == first and rows() == 2, "run_benchmark cache hits")
+    
+    # same instance and solver, but with a wall time limit: a miss, then a hit
+    command = " ".join(fake)
+    r = phi.check_satisfiability(command, time_limit=5, cache=cache)
+    check(r.status == 'UNSAT' and rows() == 3,
+          "check_satisfiability cache miss: {} rows".format(rows()))
+    check(phi.check_satisfiability(command, time_limit=5, cache=cache) == r and rows() == 3,
+          "check_satisfiability cache hit")
+    
+    cache.close()
+    for suffix in (".qdimacs", ".sqlite", ".csv"):
+        os.remove(path + suffix)
+    return not failures
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Imports:
+from tools.system_tools import SolverResult, RSS_UNIT, parse_status
+from tools.solver_runner import FIELDS
+from tools.result_cache import hash_file, hash_solver
+from time import time
+import asyncio
+import signal
+import csv
+import sys
+import os
+
+# Script that runs every solver and reports its resources (see its docstring):
+MEASURED_RUN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "measured_run.py")
+
+###############################################################################
+#========================== ASYNC SOLVER ORCHESTRATION =======================#
+###############################################################################
+
+def run_sweep(solvers, instances, log_file, workers=None, time_limit=None,
+              memory_limit=None, wall_limit=None, verbose=True, cache=None,
+              force=False):
+    """
+    Runs every solver on a sweep of sizes with a fixed number of solver
+    processes in flight, giving up on the larger sizes after a timeout.
+
+    NOTE: the instances are started in increasing order of size. As soon as a
+          solver times out on size n, its runs on every size larger than n are
+          cancelled (killing the running ones), since the formulas only get
+          harder with n. The runs of the other solvers go on. An error in a
+          run (e.g. a missing solver binary) is raised once every other run
+          has finished.
+
+    -Input-: a dictionary from solver names to commands (lists of arguments to
+    which the path of the instance is appended), an iterable of pairs (n, path
+    of the instance of size n), the path of the CSV log, the number of solver
+    processes in flight (the number of CPUs if None), the CPU time limit in
+    seconds, the memory limit in bytes and the wall time limit in seconds of
+    every run (None for no limit; the wall time limit defaults to twice the
+    CPU time limit, to leave room for the runs sharing a CPU), whether to
+    print a line per finished run, a ResultCache (None not to cache results)
+    and whether to run again the jobs whose results are cached
+    -Precondition-: the platform is POSIX
+    -Output-: a list of tuples (solver name, n, SolverResult), in order of
+    completion, without the cancelled runs
+    -Postcondition-: log_file contains a header and one row per finished run,
+    each row flushed as soon as its run finishes.
+    """
+
+    return asyncio.run(sweep(solvers, instances, log_file, workers,
+                             time_limit, memory_limit, wall_limit, verbose,
+                             cache, force))
+
+async def sweep(solvers, instances, log_file, workers=None, time_limit=None,
+                memory_limit=None, wall_limit=None, verbose=True, cache=None,
+                force=False):
+    """
+    Coroutine behind run_sweep, for callers that already run an event loop.
+    """
+
+    if wall_limit is None and time_limit is not None:
+        wall_limit = 2 * time_limit
+
+    slots = asyncio.Semaphore(workers or os.cpu_count())
+    frontier = {name: float('inf') for name in solvers} # smallest n timed out
+    tasks = dict()
+    results = list()
+    hashes = dict() # path -> task hashing the instance, shared by its jobs
+
+    def hash_instance(path):
+        # in a thread, so the event loop keeps serving the running solvers;
+        # shielded, so cancelling one job does not cancel the other ones
+        if path not in hashes:
+            hashes[path] = asyncio.create_task(asyncio.to_thread(hash_file, path))
+        return asyncio.shield(hashes[path])
+
+    file = open(log_file, 'w', newline='')
+    writer = csv.writer(file)
+    writer.writerow(FIELDS)
+
+    async def job(name, n, path):
+        r = None
+        if cache is not None:
+            key = (await hash_instance(path)).hexdigest(), hash_solver(solvers[name])
+            limits = time_limit, memory_limit, wall_limit
+            r = None if force else cache.lookup(*key, *limits)
+        if r is None:
+            async with slots:
+                r = await run_solver_async(solvers[name] + [path], time_limit,
+                                           memory_limit, wall_limit)
+            if cache is not None:
+                cache.store(*key, r, *limits)
+        results.append((name, n, r))
+        writer.writerow([name, path, r.status, r.exit_code, r.cpu_time,
+                         r.peak_rss, r.wall_time, r.timed_out])
+        file.flush()
+        if verbose:
+            print("[{}] n = {}: {} ({} s{})".format(
+                name, n, r.status, r.cpu_time, ", timed out" if r.timed_out else ""))
+
+        if r.timed_out and n < frontier[name]:
+            frontier[name] = n
+            for (other, m), task in tasks.items():
+                if other == name and m > n:
+                    task.cancel()
+
+    # tasks are created (and thus take the slots) in increasing order of n
+    for n, path in sorted(instances):
+        for name in solvers:
+            tasks[name, n] = asyncio.create_task(job(name, n, path))
+
+    try:
+        outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    finally:
+        file.close()
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException) and \
+           not isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+
+    if verbose:
+        for name in solvers:
+            if frontier[name] != float('inf'):
+                print("[{}] timed out at n = {}: larger sizes cancelled".format(
+                    name, frontier[name]))
+    return results
+
+async def run_solver_async(command, time_limit=None, memory_limit=None,
+                           wall_limit=None):
+    """
+    Asynchronous version of run_solver: runs a solver with resource limits and
+    returns a SolverResult.
+
+    NOTE: the solver is started through measured_run.py in a new process
+          group. When wall_limit expires the solver is killed (and its
+          resources and the output it wrote so far are still reported); when
+          the coroutine is cancelled the whole group is killed.
+
+    -Input-: the command as a list of arguments, a CPU time limit in seconds,
+    a memory limit in bytes and a wall time limit in seconds (None for no
+    limit)
+    -Precondition-: the platform is POSIX
+    -Output-: a SolverResult
+    -Postcondition-: the solver process has finished.
+    """
+
+    t0 = time()
+    limits = ['-' if time_limit is None else str(time_limit),
+              '-' if memory_limit is None else str(memory_limit)]
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, MEASURED_RUN, *limits, *command,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        stdin=asyncio.subprocess.DEVNULL, start_new_session=True)
+
+    # the pipes are read by their own tasks, so that the output read before
+    # the wall time limit expires is kept; stderr is only held by
+    # measured_run.py, so it is closed as soon as the report is written
+    readers = [asyncio.create_task(proc.stdout.read()),
+               asyncio.create_task(proc.stderr.read())]
+    expired = False
+    try:
+        done, _ = await asyncio.wait([readers[1]], timeout=wall_limit)
+        if not done:
+            expired = True
+            proc.terminate() # measured_run.py kills the solver and reports
+            await readers[1]
+        wall_time = time() - t0
+        kill_group(proc.pid) # children of the solver may hold the pipes
+        output, report = await asyncio.gather(*readers)
+        await proc.wait()
+    except asyncio.CancelledError:
+        kill_group(proc.pid)
+        for reader in readers:
+            reader.cancel()
+        await proc.wait()
+        raise
+
+    output = output.decode(errors='replace')
+    report = report.decode(errors='replace')
+    if len(report.split()) != 4:
+        if not expired: # e.g. the solver could not be started
+            raise OSError("cannot run '{}': {}".format(
+                command[0], (report.strip().splitlines() or ['no report'])[-1]))
+        # killed before the solver was reaped
+        return SolverResult('UNKNOWN', proc.returncode, 0.0, 0, wall_time,
+                            expired, output)
+
+    status, utime, stime, maxrss = report.split()
+    exit_code = os.waitstatus_to_exitcode(int(status))
+    cpu_time = float(utime) + float(stime)
+    timed_out = expired or time_limit is not None and (
+        exit_code == -signal.SIGXCPU or
+        (exit_code == -signal.SIGKILL and cpu_time >= time_limit))
+    return SolverResult(parse_status(output, exit_code), exit_code, cpu_time,
+                        int(maxrss) * RSS_UNIT, wall_time, timed_out, output)
+
+def kill_group(pgid):
+    """
+    Kills every process of a process group, if any is left.
+    """
+
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+A stand-in for a QBF solver, used to test the benchmark runner without any
+real solver installed.
+
+It reads a QDIMACS or QCIR instance (from the given path or from stdin),
+optionally burns CPU time (a fixed amount plus an amount per variable, so
+larger instances take longer) and allocates memory, and then answers like a
+QDIMACS solver: it prints 's cnf <0|1> <vars> <clauses>' and exits with code
+10 (SAT) or 20 (UNSAT).
+
+    python3 tools/fake_solver.py [--answer sat|unsat] [--burn SECONDS]
+                                 [--burn-per-var SECONDS]
+                                 [--alloc MEGABYTES] [instance]
+"""
+
+# Imports:
+from time import process_time
+import argparse
+import sys
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake QBF solver.")
+    parser.add_argument('instance', nargs='?', default=None)
+    parser.add_argument('--answer', choices=['sat', 'unsat'], default='unsat')
+    parser.add_argument('--burn', type=float, default=0.0)
+    parser.add_argument('--burn-per-var', type=float, default=0.0)
+    parser.add_argument('--alloc', type=int, default=0)
+    args = parser.parse_args()
+
+    file = sys.stdin if args.instance is None else open(args.instance, 'r')
+    n_vars = n_clauses = 0
+    for line in file:
+        if line.startswith("p cnf"):
+            _, _, n_vars, n_clauses = line.split()
+    file.close()
+
+    memory = bytearray(args.alloc << 20)
+    for k in range(0, len(memory), 4096): # touch every page
+        memory[k] = 1
+
+    burn = args.burn + args.burn_per_var * int(n_vars)
+    t0 = process_time()
+    while process_time() - t0 < burn:
+        pass
+
+    sat = args.answer == 'sat'
+    print("s cnf {} {} {}".format(int(sat), n_vars, n_clauses))
+    sys.exit(10 if sat else 20)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Runs a solver with resource limits and reports the resources it used, for
+callers that cannot reap the solver themselves (e.g. asyncio, which waits for
+its children on its own).
+
+    python3 tools/measured_run.py TIME_LIMIT MEMORY_LIMIT command...
+
+The limits are a CPU time in seconds and an address space in bytes ('-' for
+no limit). The output of the solver (stdout and stderr) goes onto stdout and,
+once the solver has finished, a single line
+
+    <wait status> <user time> <system time> <ru_maxrss>
+
+is written onto stderr with the rusage returned by wait4 for the solver. The
+solver stays in the process group of this script, so killing the group kills
+both. On SIGTERM the solver is killed and its resources are still reported.
+"""
+
+# Imports:
+import subprocess
+import resource
+import signal
+import sys
+import os
+
+def main():
+    time_limit, memory_limit = sys.argv[1:3]
+    command = sys.argv[3:]
+
+    def set_limits():
+        if time_limit != '-':
+            t = max(1, int(float(time_limit) + 0.999))
+            resource.setrlimit(resource.RLIMIT_CPU, (t, t + 1))
+        if memory_limit != '-':
+            m = int(memory_limit)
+            resource.setrlimit(resource.RLIMIT_AS, (m, m))
+
+    proc = subprocess.Popen(command, stderr=subprocess.STDOUT,
+                            stdin=subprocess.DEVNULL, preexec_fn=set_limits)
+    signal.signal(signal.SIGTERM, lambda *_: proc.kill())
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    sys.stderr.write("{} {} {} {}\n".format(status, usage.ru_utime,
+                                            usage.ru_stime, usage.ru_maxrss))
+
+if __name__ == "__main__":
+    main()
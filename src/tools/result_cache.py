@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Imports:
+from tools.system_tools import SolverResult
+from hashlib import sha256
+import sqlite3
+import shutil
+import os
+
+HASH_BLOCK = 1 << 20 # bytes read at a time when hashing files
+
+###############################################################################
+#============================= ResultCache Class =============================#
+###############################################################################
+
+class ResultCache:
+    """
+    A persistent store of solver results in an SQLite database.
+
+    A result is identified by the hash of the instance, the hash of the solver
+    (its binary and its arguments, see hash_solver) and the limits of the run
+    (CPU time, memory and, if any, wall time), so a result is only reused for
+    the very same instance, solver and limits.
+
+
+    Attributes
+    ----------
+    path : str
+        the path of the database
+    connection : sqlite3.Connection
+        the connection to the database
+
+    Methods
+    -------
+    lookup(instance, solver, time_limit=None, memory_limit=None, wall_limit=None)
+        Returns the SolverResult stored for the given instance and solver
+        hashes and limits, or None if there is none.
+
+    store(instance, solver, result, time_limit=None, memory_limit=None, wall_limit=None)
+        Stores a SolverResult, replacing any previous result with the same key.
+
+    close()
+        Closes the connection to the database.
+
+    """
+
+    def __init__(self, path="./output_files/results.sqlite"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                instance TEXT, solver TEXT, limits TEXT,
+                status TEXT, exit_code INTEGER, cpu_time REAL, peak_rss INTEGER,
+                wall_time REAL, timed_out INTEGER, output TEXT,
+                PRIMARY KEY (instance, solver, limits))""")
+
+    def lookup(self, instance, solver, time_limit=None, memory_limit=None,
+               wall_limit=None):
+        row = self.connection.execute("""
+            SELECT status, exit_code, cpu_time, peak_rss, wall_time, timed_out, output
+            FROM results WHERE instance = ? AND solver = ? AND limits = ?""",
+            (instance, solver, get_limits_key(time_limit, memory_limit, wall_limit))).fetchone()
+        if row is None:
+            return None
+        status, exit_code, cpu_time, peak_rss, wall_time, timed_out, output = row
+        return SolverResult(status, exit_code, cpu_time, peak_rss, wall_time,
+                            bool(timed_out), output)
+
+    def store(self, instance, solver, result, time_limit=None, memory_limit=None,
+              wall_limit=None):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (instance, solver, get_limits_key(time_limit, memory_limit, wall_limit),
+                 result.status, result.exit_code, result.cpu_time,
+                 result.peak_rss, result.wall_time, int(result.timed_out),
+                 result.output))
+
+    def close(self):
+        self.connection.close()
+
+###############################################################################
+###############################################################################
+
+# =============================== Cache keys ================================= #
+
+def get_limits_key(time_limit, memory_limit, wall_limit=None):
+    """
+    Returns the text identifying the limits of a run (None for no limit). The
+    wall time limit only appears when there is one, so the keys of the runs
+    limited by CPU time and memory alone stay the same.
+    """
+
+    if wall_limit is None:
+        return "{}|{}".format(time_limit, memory_limit)
+    return "{}|{}|{}".format(time_limit, memory_limit, wall_limit)
+
+def hash_file(path, digest=None):
+    """
+    Returns the SHA-256 of the contents of a file (or updates digest with
+    them and returns it, if given).
+    """
+
+    if digest is None:
+        digest = sha256()
+    with open(path, 'rb') as file:
+        block = file.read(HASH_BLOCK)
+        while block:
+            digest.update(block)
+            block = file.read(HASH_BLOCK)
+    return digest
+
+def hash_instance(write):
+    """
+    Returns the hexadecimal SHA-256 of the text written by write(out), without
+    keeping the text in memory (e.g. hash_instance(phi.write_QDIMACS)).
+    """
+
+    class HashWriter:
+        def __init__(self):
+            self.digest = sha256()
+        def write(self, text):
+            self.digest.update(text.encode())
+
+    out = HashWriter()
+    write(out)
+    return out.digest.hexdigest()
+
+solver_hashes = dict() # hashes of the solver commands already seen
+
+def hash_solver(command):
+    """
+    Returns the hexadecimal SHA-256 of a solver command (a list of
+    arguments): the contents of the executable and of every argument that is
+    a file (e.g. a script run by an interpreter), and the text of the other
+    arguments. The hash changes when the solver is updated or its options
+    change. Hashes are memoized by command.
+    """
+
+    command = tuple(command)
+    if command not in solver_hashes:
+        digest = sha256()
+        for k, word in enumerate(command):
+            path = shutil.which(word) if k == 0 else word
+            if path is not None and os.path.isfile(path):
+                hash_file(path, digest)
+            else:
+                digest.update(word.encode())
+            digest.update(b'\0')
+        solver_hashes[command] = digest.hexdigest()
+    return solver_hashes[command]
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Imports:
+from tools.system_tools import run_solver
+from tools.result_cache import hash_file, hash_solver
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import csv
+import os
+
+# Fields of every row of the results file:
+FIELDS = ['solver', 'instance', 'status', 'exit_code', 'cpu_time', 'peak_rss',
+          'wall_time', 'timed_out']
+
+###############################################################################
+#=========================== SOLVER BENCHMARK RUNNER =========================#
+###############################################################################
+
+def run_benchmark(solvers, instances, results_file, workers=None,
+                  time_limit=None, memory_limit=None, verbose=True,
+                  cache=None, force=False):
+    """
+    Runs every solver on every instance using a fixed number of worker slots
+    and writes one row per run onto a CSV file.
+
+    NOTE: every slot is a thread waiting on its own solver process, so up to
+          workers solvers run at the same time. The CPU time and the peak RSS
+          are those of each solver process (see run_solver), not wall times,
+          so they are not inflated by the other runs waiting for a CPU.
+
+    -Input-: a dictionary from solver names to commands (lists of arguments to
+    which the path of the instance is appended), an iterable of paths of
+    instances, the path of the CSV results file, the number of worker slots
+    (the number of CPUs if None), the CPU time limit in seconds and the memory
+    limit in bytes of every run (None for no limit), whether to print a line
+    per finished run, a ResultCache (None not to cache results) and whether
+    to run again the jobs whose results are cached
+    -Precondition-: the platform is Linux (see run_solver)
+    -Output-: a list of tuples (solver name, instance, SolverResult) in the
+    order of the instances and, for each instance, of the solvers
+    -Postcondition-: results_file contains a header and one row per run, in
+    order of completion; each row is flushed as soon as its run finishes.
+    The cached results are written first and only the other jobs are run.
+    """
+
+    jobs = [(name, path) for path in instances for name in solvers]
+    results = dict()
+    keys = dict()
+
+    with open(results_file, 'w', newline='') as file, \
+         ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        writer = csv.writer(file)
+        writer.writerow(FIELDS)
+
+        def record(name, path, r, cached=False):
+            results[name, path] = r
+            writer.writerow([name, path, r.status, r.exit_code, r.cpu_time,
+                             r.peak_rss, r.wall_time, r.timed_out])
+            file.flush()
+            if verbose:
+                print("[{}] {}: {} ({} s{}{})".format(
+                    name, path, r.status, r.cpu_time,
+                    ", timed out" if r.timed_out else "",
+                    ", cached" if cached else ""))
+
+        if cache is not None:
+            hashes = {path: hash_file(path).hexdigest() for path in set(instances)}
+            for name, path in jobs:
+                keys[name, path] = hashes[path], hash_solver(solvers[name])
+                r = None if force else cache.lookup(*keys[name, path],
+                                                   time_limit, memory_limit)
+                if r is not None:
+                    record(name, path, r, cached=True)
+
+        futures = {pool.submit(run_solver, solvers[name] + [path],
+                               time_limit, memory_limit): (name, path)
+                   for name, path in jobs if (name, path) not in results}
+
+        # rows are written as the runs finish, whatever their order
+        for future in as_completed(futures):
+            name, path = futures[future]
+            r = future.result()
+            record(name, path, r)
+            if cache is not None:
+                cache.store(*keys[name, path], r, time_limit, memory_limit)
+
+    return [(name, path, results[name, path]) for name, path in jobs]
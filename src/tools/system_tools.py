@@ -2,8 +2,35 @@
 # -*- coding: utf-8 -*-
 
 # Imports:
+from collections import namedtuple
+from time import time
+import subprocess
+import io
+import threading
+import resource
+import signal
+import gzip
+import bz2
+import lzma
+import sys
 import os
 
+OUTPUT_BUFFER = 1 << 20 # size in bytes of the buffer of the output files
+
+# Bytes per unit of ru_maxrss: bytes on macOS, KiB on Linux
+RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+# Result of a solver run: the answer ('SAT', 'UNSAT' or 'UNKNOWN'), the exit
+# code, the CPU time of the solver in seconds, its peak resident set size in
+# bytes, the wall time in seconds, whether it hit a time limit and its
+# standard output
+SolverResult = namedtuple('SolverResult', ['status', 'exit_code', 'cpu_time',
+                                           'peak_rss', 'wall_time',
+                                           'timed_out', 'output'])
+
+# Solvers that read the instance from stdin when no file is given:
+STDIN_SOLVERS = {'depqbf', 'fake_solver.py'}
+
 ###############################################################################
 #================================ SYSTEM TOOLS ===============================#
 ###############################################################################
@@ -19,6 +46,39 @@ def run_command(command):
     call.close()
     return output
 
+def open_output(path, buffering=OUTPUT_BUFFER):
+    """
+    Opens a text file for writing, compressing it on the fly according to the
+    suffix of its path: '.gz' (gzip), '.bz2' (bzip2), '.xz' (xz) or '.zst'
+    (Zstandard, if the zstandard package is installed). Any other path is
+    opened as a plain text file.
+
+    NOTE: the text is compressed as it is written, so a formula streamed onto
+          the file object is never held in memory, neither as text nor
+          compressed. The compression levels favour speed over size, since
+          the formulas are highly repetitive anyway.
+
+    -Input-: a path and the size in bytes of the write buffer
+    -Output-: a text file object opened for writing
+    """
+
+    if path.endswith('.gz'):
+        file = gzip.open(path, 'wb', compresslevel=1)
+    elif path.endswith('.bz2'):
+        file = bz2.open(path, 'wb', compresslevel=1)
+    elif path.endswith('.xz'):
+        file = lzma.open(path, 'wb', preset=1)
+    elif path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("writing '.zst' files requires the zstandard package")
+        file = zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+    else:
+        return open(path, 'w', buffering=buffering)
+
+    return io.TextIOWrapper(io.BufferedWriter(file, buffering), encoding='utf-8')
+
 def clear():
     """
     Clears the Python terminal both on Windows and Linux.    
@@ -31,3 +91,127 @@ def clear():
     # for mac and linux(here, os.name is 'posix')run java 
     else:
         _ = os.system('clear')
+
+def run_solver(command, time_limit=None, memory_limit=None, wall_limit=None,
+               write_input=None):
+    """
+    Runs a solver on an instance with optional resource limits and measures
+    the resources used by the solver process itself.
+
+    NOTE: the limits are set with prlimit on the child right after it is
+          spawned (RLIMIT_CPU in seconds, RLIMIT_AS in bytes) and the
+          resources are taken from the rusage returned by wait4 for that
+          child only, so several solvers can run at the same time from
+          different threads. No code runs in the child between the fork and
+          the exec (a preexec_fn can deadlock there when other threads run),
+          so the solver may run for a few microseconds before its limits
+          apply.
+          On Linux the peak RSS of a child includes the pages it inherits from
+          the fork, so it is only accurate when this process is small compared
+          to the solver (as in tools.solver_runner).
+          The solver runs in its own process group, which is killed as a whole
+          once wall_limit seconds have passed.
+          When write_input is given, it is called from another thread with a
+          text stream onto the stdin of the solver, so the instance can be
+          generated while the solver is parsing it.
+
+    -Input-: the command as a list of arguments (e.g. ['depqbf', path]), a CPU
+    time limit in seconds, a memory limit in bytes, a wall time limit in
+    seconds (None for no limit) and a function write_input(out) writing the
+    instance onto a file object (None to leave stdin empty)
+    -Precondition-: the platform is Linux (for prlimit)
+    -Output-: a SolverResult
+    -Postcondition-: the solver process has finished and has been reaped.
+    """
+
+    t0 = time()
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT,
+                            stdin=subprocess.DEVNULL if write_input is None else subprocess.PIPE,
+                            start_new_session=True)
+    try:
+        if time_limit is not None:
+            t = max(1, int(time_limit + 0.999))
+            resource.prlimit(proc.pid, resource.RLIMIT_CPU, (t, t + 1))
+        if memory_limit is not None:
+            resource.prlimit(proc.pid, resource.RLIMIT_AS, (memory_limit, memory_limit))
+    except ProcessLookupError: # the solver has already exited
+        pass
+    expired = threading.Event()
+    errors = list()
+
+    def feed():
+        stream = io.TextIOWrapper(proc.stdin, encoding='ascii')
+        try:
+            write_input(stream)
+        except BrokenPipeError: # the solver stopped reading (e.g. killed)
+            pass
+        except BaseException as e:
+            errors.append(e)
+            kill_group()
+        finally:
+            try:
+                stream.close() # flushes what is left in the buffer
+            except BrokenPipeError:
+                pass
+
+    def kill_group():
+        expired.set()
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    if wall_limit is not None:
+        watchdog = threading.Timer(wall_limit, kill_group)
+        watchdog.start()
+    if write_input is not None:
+        feeder = threading.Thread(target=feed)
+        feeder.start()
+    output = proc.stdout.read().decode(errors='replace')
+    proc.stdout.close()
+    if write_input is not None:
+        feeder.join()
+    if wall_limit is not None:
+        watchdog.cancel() # before reaping, so the group id cannot be reused
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = exit_code = os.waitstatus_to_exitcode(status)
+    if errors:
+        raise errors[0]
+    wall_time = time() - t0
+
+    cpu_time = usage.ru_utime + usage.ru_stime
+    timed_out = expired.is_set() or time_limit is not None and (
+        exit_code == -signal.SIGXCPU or
+        (exit_code == -signal.SIGKILL and cpu_time >= time_limit))
+    peak_rss = usage.ru_maxrss * RSS_UNIT
+    return SolverResult(parse_status(output, exit_code), exit_code, cpu_time,
+                        peak_rss, wall_time, timed_out, output)
+
+def parse_status(output, exit_code):
+    """
+    Returns 'SAT', 'UNSAT' or 'UNKNOWN' from the exit code (10 and 20 as in
+    the QBFEVAL conventions) or the solution line of the output of a solver
+    ('s cnf 1' / 's cnf 0' for QDIMACS, 'r SAT' / 'r UNSAT' for QCIR).
+    """
+
+    if exit_code == 10:
+        return 'SAT'
+    elif exit_code == 20:
+        return 'UNSAT'
+
+    for line in output.splitlines():
+        words = line.split()
+        if words[:3] == ['s', 'cnf', '1'] or words[:2] == ['r', 'SAT']:
+            return 'SAT'
+        elif words[:3] == ['s', 'cnf', '0'] or words[:2] == ['r', 'UNSAT']:
+            return 'UNSAT'
+    return 'UNKNOWN'
+
+def reads_stdin(command):
+    """
+    Returns whether the solver of a command (a list of arguments) is known to
+    read its instance from stdin, i.e. whether it is in STDIN_SOLVERS.
+    """
+
+    return any(os.path.basename(word) in STDIN_SOLVERS for word in command)